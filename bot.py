@@ -3,71 +3,129 @@ SMC Trading Bot - Main Orchestrator
 Scans the market, calculates SMC indicators, and executes trades via Mudrex.
 """
 
+import atexit
 import logging
+import queue
 import time
 import json
 import os
-from typing import Tuple, Optional
-from market_data import BybitDataFetcher
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, List, Tuple, Optional
+import numpy as np
+import pandas as pd
+from market_data import Bars, TokenBucket, get_shared_fetcher, interval_seconds
 from smc_indicators import calculate_smc
 from strategy import StrategyManager
 from executor import MudrexExecutor
 from tracker import TradeTracker
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
-)
+__all__ = ["SMCTradingBot"]
+
+# orjson is optional - stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging - file/console writes happen on a listener thread, so
+# scan workers only enqueue records. force=True replaces the handlers the
+# imported modules' basicConfig calls already installed.
+_log_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.FileHandler("bot.log"), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_format)
+
+_log_queue = queue.Queue(-1)
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Final format is applied by the listener
+_log_listener = QueueListener(_log_queue, *_log_handlers)
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler], force=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+# Environment variable -> (config section, key, cast)
+ENV_OVERRIDES = [
+    ("MUDREX_API_KEY", ("mudrex", "api_key"), str),
+    ("MUDREX_API_SECRET", ("mudrex", "api_secret"), str),
+    ("MARGIN_PER_TRADE", ("mudrex", "margin_per_trade"), float),
+    ("LEVERAGE", ("mudrex", "leverage"), int),
+    ("MAX_POSITIONS", ("mudrex", "max_positions"), int),
+    ("DRY_RUN", ("bot", "dry_run"), lambda v: v.lower() == "true"),
+]
+
+
+def _read_json(path: str) -> dict:
+    """Parse a JSON file, with orjson when available."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def _load_config_with_env(config_path: str) -> dict:
+    """
+    Load the bot config and apply environment overrides.
+    
+    Falls back to config.template.json when config_path doesn't exist.
+    """
+    # Load config - try primary path first, then template
+    if os.path.exists(config_path):
+        config = _read_json(config_path)
+    elif os.path.exists("config.template.json"):
+        logger.info("⚠️ config.json not found, using config.template.json")
+        config = _read_json("config.template.json")
+    else:
+        raise FileNotFoundError(f"Could not find {config_path} or config.template.json")
+    
+    # Override with environment variables if set (for Railway deployment)
+    logger.info(f"Environment keys available: {[k for k in os.environ.keys() if 'API' in k or 'MUDREX' in k]}")
+    
+    for var, (section, key), cast in ENV_OVERRIDES:
+        value = os.environ.get(var)
+        if value:
+            config[section][key] = cast(value)
+    
+    return config
+
+
+# Enforce max 3 positions regardless of config
+MAX_POSITIONS = 3
+
+# Symbols scanned concurrently (scan is I/O-bound on Bybit round-trips)
+DEFAULT_SCAN_WORKERS = 8
+
+
+@dataclass(slots=True)
+class Position:
+    """A dry-run paper position."""
+    symbol: str
+    side: str  # "LONG" or "SHORT"
+    entry_price: float
+    take_profit: float
+    stop_loss: float
+    opened_at: datetime = field(default_factory=datetime.now)
+    details: dict = field(default_factory=dict)
+
 
 class SMCTradingBot:
     """Main trading bot class."""
     
     def __init__(self, config_path: str = "config.json"):
         """Initialize the bot with configuration."""
-        import os
-        
-        # Load config - try primary path first, then template
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                self.config = json.load(f)
-        elif os.path.exists("config.template.json"):
-            logger.info("⚠️ config.json not found, using config.template.json")
-            with open("config.template.json", 'r') as f:
-                self.config = json.load(f)
-        else:
-            raise FileNotFoundError(f"Could not find {config_path} or config.template.json")
-        
-        # Override with environment variables if set (for Railway deployment)
-        logger.info(f"Environment keys available: {[k for k in os.environ.keys() if 'API' in k or 'MUDREX' in k]}")
-        
-        api_key = os.environ.get("MUDREX_API_KEY", self.config["mudrex"].get("api_key", ""))
-        api_secret = os.environ.get("MUDREX_API_SECRET", self.config["mudrex"].get("api_secret", ""))
+        self.config = _load_config_with_env(config_path)
         
-        if not api_secret:
+        if not self.config["mudrex"].get("api_secret"):
             raise ValueError("MUDREX_API_SECRET must be set in environment or config.json")
-        
-        self.config["mudrex"]["api_key"] = api_key
-        self.config["mudrex"]["api_secret"] = api_secret
-        
-        # Trading settings from env vars
-        if os.environ.get("MARGIN_PER_TRADE"):
-            self.config["mudrex"]["margin_per_trade"] = float(os.environ.get("MARGIN_PER_TRADE"))
-        if os.environ.get("LEVERAGE"):
-            self.config["mudrex"]["leverage"] = int(os.environ.get("LEVERAGE"))
-        if os.environ.get("MAX_POSITIONS"):
-            self.config["mudrex"]["max_positions"] = int(os.environ.get("MAX_POSITIONS"))
-        if os.environ.get("DRY_RUN"):
-            self.config["bot"]["dry_run"] = os.environ.get("DRY_RUN").lower() == "true"
             
         # Initialize components
-        self.fetcher = BybitDataFetcher()
+        # Same pool as the executor's price lookups
+        self.fetcher = get_shared_fetcher(http2=self.config["bot"].get("http2", False))
         self.strategy = StrategyManager(self.config)
         self.executor = MudrexExecutor(
             api_secret=self.config["mudrex"]["api_secret"],
@@ -77,75 +135,173 @@ class SMCTradingBot:
         self.tracker = TradeTracker()
         
         self.dry_run = self.config["bot"].get("dry_run", False)
+        self.scan_workers = self.config["mudrex"].get("scan_workers", DEFAULT_SCAN_WORKERS)
+        
+        # Settings used on every scan - resolve the nested config once
+        strategy_cfg = self.config["strategy"]
+        self._timeframe = str(strategy_cfg.get("timeframe", "15"))  # Bybit interval string
+        self._tf_sec = interval_seconds(self._timeframe)  # None for "W"/"M"
+        self._margin_per_trade = self.config["mudrex"]["margin_per_trade"]
+        self._check_interval = self.config["bot"]["check_interval_seconds"]
+        
+        # Once-per-bar scanning: analyze closed bars only, skip symbols already
+        # scanned on the latest closed bar
+        self._bar_ms = self._tf_sec * 1000 if self._tf_sec and self.config["bot"].get("once_per_bar", True) else None
+        self._last_bar_ts: Dict[str, int] = {}
+        self._scan_smc = partial(
+            calculate_smc,
+            swing_length=strategy_cfg.get("swing_length", 10), # Legacy or common
+            atr_period=strategy_cfg.get("common", {}).get("atr_period", 14)
+        )
+        # Last indicator frame per symbol, keyed on the bars it was computed from.
+        # Once-per-bar scanning only rescans after a new bar, so it would never hit
+        self._smc_cache: Optional[Dict[str, Tuple[tuple, pd.DataFrame]]] = None if self._bar_ms else {}
+        
+        # Scan pacing: one symbol per scan_delay_ms on average, bursts up to the pool size
+        scan_delay_ms = max(self.config["mudrex"]["scan_delay_ms"], 1)
+        self._bucket = TokenBucket(rate=1000 / scan_delay_ms, capacity=self.scan_workers)
+        
+        # Open positions, reconciled with the exchange once per cycle and
+        # bumped on each order placed in between
+        self._open_count = 0
+        
+        # Dry-run paper positions by symbol, closed by monitor_positions
+        self.current_positions: Dict[str, Position] = {}
         
         if self.dry_run:
             logger.info("⚠️ Bot starting in DRY RUN mode - No real trades will be executed")
         else:
             logger.info("🚨 Bot starting in LIVE TRADING mode")
+        
+        self._warmup()
+    
+    def _warmup(self, n: int = 200):
+        """
+        Run the indicator pipeline once on synthetic bars.
+        
+        Loads (or compiles) the numba kernels and primes the pandas/SMC code
+        paths before the first scan rather than during it.
+        """
+        start = time.perf_counter()
+        close = 100 + np.sin(np.arange(n, dtype=np.float64) / 5)
+        open_ = np.roll(close, 1)
+        bars = Bars(
+            ts=np.arange(n, dtype=np.float64) * 60_000,
+            o=open_,
+            h=np.maximum(open_, close) + 0.5,
+            l=np.minimum(open_, close) - 0.5,
+            c=close,
+            v=np.ones(n)
+        )
+        try:
+            self._scan_smc(bars)
+            logger.info(f"🔥 Indicators warmed up in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Indicator warm-up failed: {e}")
             
     def scan_symbol(self, symbol: str) -> Tuple[Optional[str], Optional[dict]]:
         """Scan a single symbol for trading signals."""
         try:
             # 1. Fetch data
-            timeframe = self.config["strategy"].get("timeframe", "15")
-            
             # Fetch enough candles for all strategies (200 is safe default)
-            df = self.fetcher.get_klines(symbol, timeframe, 200)
+            bars = self.fetcher.get_bars(symbol, self._timeframe, 200)
             
-            if df is None:
-                return None, None
-                
-            # 2. Calculate Indicators
-            # Note: StrategyManager expects DF with indicators
-            # We use common settings for indicators, strategies might use subsets
-            df = calculate_smc(
-                df, 
-                swing_length=self.config["strategy"].get("swing_length", 10), # Legacy or common
-                atr_period=self.config["strategy"].get("common", {}).get("atr_period", 14)
-            )
-            
-            # 3. Check for Signals
-            side, details = self.strategy.check_signals(df, symbol)
-            
-            if side:
-                logger.info(f"✅ Found {side} signal on {symbol}: {details}")
-                return side, details
-                
-            return None, None
+            return self._analyze(symbol, bars)
             
         except Exception as e:
             logger.error(f"Error scanning {symbol}: {e}")
             return None, None
+    
+    def _analyze(self, symbol: str, bars) -> Tuple[Optional[str], Optional[dict]]:
+        """Calculate indicators on fetched bars and check strategies."""
+        if bars is None:
+            return None, None
+        
+        if self._bar_ms:
+            # Drop the still-forming bar and remember which closed bar we saw
+            if bars.ts.size and bars.ts[-1] + self._bar_ms > time.time() * 1000:
+                bars = bars[:-1]
+            if bars.ts.size:
+                self._last_bar_ts[symbol] = int(bars.ts[-1])
             
-    def execute_signal(self, symbol: str, side: str, details: dict):
-        """Execute a trade signal."""
+        # 2. Calculate Indicators
+        # Note: StrategyManager expects DF with indicators
+        # We use common settings for indicators, strategies might use subsets
+        df = self._calculate_smc(symbol, bars)
+        
+        # 3. Check for Signals
+        side, details = self.strategy.check_signals(df, symbol)
+        
+        if side:
+            logger.info(f"✅ Found {side} signal on {symbol}: {details}")
+            # Hand the analyzed frame to execute_signal so it doesn't re-fetch;
+            # price is the signal bar close, the fallback when no live price
+            return side, {**details, "df": df, "price": float(df["close"].to_numpy()[-1])}
+            
+        return None, None
+            
+    def _calculate_smc(self, symbol: str, bars: Bars) -> pd.DataFrame:
+        """
+        Calculate indicators, reusing the last result while the bars are unchanged.
+        
+        Closed bars never change, so the window length plus the newest bar
+        identifies the input. A still-forming bar that has ticked since the
+        last scan changes the key and is recomputed.
+        
+        Only enabled with once_per_bar off, where a symbol is rescanned every
+        cycle and hits whenever no trade printed on it since the last scan.
+        """
+        if self._smc_cache is None or not len(bars):
+            return self._scan_smc(bars)
+        
+        key = (len(bars), bars.ts[-1], bars.h[-1], bars.l[-1], bars.c[-1], bars.v[-1])
+        cached = self._smc_cache.get(symbol)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        df = self._scan_smc(bars)
+        self._smc_cache[symbol] = (key, df)
+        return df
+            
+    def execute_signal(self, symbol: str, side: str, details: dict) -> bool:
+        """Execute a trade signal. Returns True if a live order was placed."""
         try:
-            # Get current price
+            # Reuse the bar data analyzed in scan_symbol (already has ATR)
+            df = details["df"]
+            
+            # Signals come from closed bars, so price the entry live; the
+            # signal bar's close is only the fallback
             price = self.fetcher.get_current_price(symbol)
-            if not price:
-                logger.error(f"Could not get current price for {symbol}")
-                return
+            if price is None:
+                logger.warning(f"⚠️ No live price for {symbol}, using the signal bar close")
+                price = details["price"]
 
             # Calculate Exit Levels (SL/TP)
-            # StrategyManager helper needs DF for ATR. Re-fetch minimal data.
-            timeframe = self.config["strategy"].get("timeframe", "15")
-            df = self.fetcher.get_klines(symbol, timeframe, 50)
-            df = calculate_smc(df) # Need ATR
-            
             sl_price, tp_price = self.strategy.get_exit_levels(price, side, df, details)
             
             logger.info(f"🚀 Executing {side} on {symbol} | Price: {price} | SL: {sl_price} | TP: {tp_price}")
             
             if self.dry_run:
+                if symbol in self.current_positions:
+                    logger.info(f"⏭️ {symbol} already has an open paper position")
+                    return False
+                self.current_positions[symbol] = Position(
+                    symbol=symbol,
+                    side=side,
+                    entry_price=price,
+                    take_profit=tp_price,
+                    stop_loss=sl_price,
+                    details={k: v for k, v in details.items() if k != "df"}
+                )
                 self.tracker.log_trade({
                     "symbol": symbol,
                     "side": side,
                     "entry_price": price,
-                    "position_size": self.config["mudrex"]["margin_per_trade"],
+                    "position_size": self._margin_per_trade,
                     "pnl": 0,
                     "status": "dry_run"
                 })
-                return
+                return False
 
             # Execute via Mudrex
             order = self.executor.place_market_order(
@@ -160,14 +316,133 @@ class SMCTradingBot:
                     "symbol": symbol,
                     "side": side,
                     "entry_price": price,
-                    "position_size": self.config["mudrex"]["margin_per_trade"],
+                    "position_size": self._margin_per_trade,
                     "pnl": 0,
                     "status": "open",
                     "order_id": order.get("id")
                 })
+                return True
                 
         except Exception as e:
             logger.error(f"Execution failed for {symbol}: {e}")
+        return False
+
+    def monitor_positions(self):
+        """Close dry-run paper positions whose TP or SL has been hit."""
+        if not self.current_positions:
+            return
+        
+        positions = list(self.current_positions.values())
+        n = len(positions)
+        
+        # One tickers call for all positions; missing symbols become NaN,
+        # which never compares as a hit
+        tickers = self.fetcher.get_all_tickers()
+        prices = np.fromiter((tickers.get(p.symbol, np.nan) for p in positions), np.float64, n)
+        entries = np.fromiter((p.entry_price for p in positions), np.float64, n)
+        tps = np.fromiter((p.take_profit for p in positions), np.float64, n)
+        sls = np.fromiter((p.stop_loss for p in positions), np.float64, n)
+        longs = np.fromiter((p.side == "LONG" for p in positions), np.bool_, n)
+        
+        pnl = np.where(longs, prices - entries, entries - prices) / entries * 100
+        hit_tp = np.where(longs, prices >= tps, prices <= tps)
+        hit_sl = np.where(longs, prices <= sls, prices >= sls)
+        
+        # Every price is NaN when the tickers call failed
+        priced = np.isfinite(pnl)
+        if priced.any():
+            logger.info(f"📄 Paper positions: {n} | Avg PnL: {pnl[priced].mean():+.2f}%")
+        else:
+            logger.info(f"📄 Paper positions: {n} | Avg PnL: n/a (no prices)")
+        
+        leverage = self.config["mudrex"]["leverage"]
+        for i in np.flatnonzero(hit_tp | hit_sl):
+            pos = positions[i]
+            exit_reason = "TP" if hit_tp[i] else "SL"
+            exit_price = pos.take_profit if hit_tp[i] else pos.stop_loss
+            self.tracker.record_trade(
+                symbol=pos.symbol,
+                side=pos.side,
+                entry_price=pos.entry_price,
+                exit_price=exit_price,
+                quantity=self._margin_per_trade * leverage / pos.entry_price,
+                leverage=leverage,
+                margin_used=self._margin_per_trade,
+                exit_reason=exit_reason,
+                entry_details={**pos.details, "opened_at": pos.opened_at.isoformat()}
+            )
+            del self.current_positions[pos.symbol]
+
+    def _make_symbols_to_scan(self, symbols: List[str]) -> Callable[[], List[str]]:
+        """
+        Build the per-cycle filter for symbols with a newly closed bar.
+        
+        The symbol tuple, bar length and lookups are bound once as closure
+        locals instead of being re-resolved through self every cycle.
+        """
+        symbols = tuple(symbols)
+        bar_ms = self._bar_ms
+        if not bar_ms:
+            return lambda: list(symbols)
+        
+        last_bar_ts = self._last_bar_ts.get
+        clock = time.time
+        
+        def symbols_to_scan() -> List[str]:
+            now_ms = int(clock() * 1000)
+            last_closed = now_ms - now_ms % bar_ms - bar_ms
+            return [s for s in symbols if last_bar_ts(s, 0) < last_closed]
+        
+        return symbols_to_scan
+
+    def _handle_signal(self, symbol: str, side: str, details: dict) -> bool:
+        """Execute a signal. Returns False once the scan should stop."""
+        if self.execute_signal(symbol, side, details):
+            self._open_count += 1
+        elif self.dry_run:
+            # Paper positions stand in for exchange ones
+            self._open_count = len(self.current_positions)
+        
+        # Count reconciled at the top of the cycle plus our own fills; a
+        # position closing mid-cycle only makes this conservative
+        if self._open_count >= MAX_POSITIONS:
+            logger.info(f"⏳ Max positions reached ({self._open_count}/{MAX_POSITIONS}). Stopping scan.")
+            return False
+        
+        # Check cooldown before the next potential trade
+        in_cooldown, _ = self.executor.is_in_cooldown()
+        if in_cooldown:
+            logger.info("⏳ Balance cooldown activated. Stopping scan.")
+            return False
+        
+        return True
+
+    def _scan_worker(self, symbol: str) -> Tuple[Optional[str], Optional[dict]]:
+        """Scan a symbol from a pool thread once the rate limiter allows it."""
+        self._bucket.acquire()
+        return self.scan_symbol(symbol)
+
+    def _scan_batch(self, symbols: list):
+        """Scan symbols in parallel threads and execute signals as they come in."""
+        total = len(symbols)
+        
+        with ThreadPoolExecutor(max_workers=self.scan_workers) as pool:
+            futures = {pool.submit(self._scan_worker, symbol): symbol for symbol in symbols}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    # Progress log every 25 symbols
+                    if done % 25 == 0:
+                        logger.info(f"   Progress: {done}/{total}...")
+                    
+                    side, details = future.result()
+                    
+                    # Orders are placed serially from this thread
+                    if side and not self._handle_signal(futures[future], side, details):
+                        break
+            finally:
+                # Drop scans that haven't started yet
+                for future in futures:
+                    future.cancel()
 
     def run(self):
         """Run the main bot loop."""
@@ -175,18 +450,29 @@ class SMCTradingBot:
         logger.info("🧠 SMC Trading Bot - Smart Money Concepts")
         logger.info("============================================================")
         
-        # Get count of symbols to scan
-        symbols = self.executor.get_available_symbols()
-        # Filter symbols
+        # Get symbols to scan - filter and cap in a single pass
         quote_currency = self.config["mudrex"]["filter"]["quote_currency"]
-        symbols = [s for s in symbols if s.endswith(quote_currency)]
         max_symbols = self.config["mudrex"]["filter"]["max_symbols"]
-        symbols = symbols[:max_symbols]
+        symbols = list(islice(
+            (s for s in self.executor.get_available_symbols() if s.endswith(quote_currency)),
+            max_symbols
+        ))
+        
+        # Pay DNS + TLS now rather than on the first scan
+        self.fetcher.warm_up()
+        
+        # One kline block for all symbols, reused every cycle
+        self.fetcher.preallocate(symbols, self._timeframe)
+        
+        # Stream klines over WebSocket; get_klines falls back to REST per symbol
+        if self.config["bot"].get("websocket", True):
+            self.fetcher.start_kline_stream(symbols, self._timeframe)
         
         logger.info(f"Total Symbols:   {len(symbols)}")
-        logger.info(f"Timeframe:       {self.config['strategy'].get('timeframe', '15')}m")
+        tf_label = f"{self._timeframe}m" if self._timeframe.isdigit() else self._timeframe
+        logger.info(f"Timeframe:       {tf_label}")
         logger.info(f"Leverage:        {self.config['mudrex']['leverage']}x")
-        logger.info(f"Margin/Trade:    ${self.config['mudrex']['margin_per_trade']}")
+        logger.info(f"Margin/Trade:    ${self._margin_per_trade}")
         logger.info(f"Max Positions:   {self.config['mudrex']['max_positions']}")
         mode = "DRY RUN 🧪" if self.dry_run else "LIVE TRADING ⚠️"
         logger.info(f"Mode:            {mode}")
@@ -197,8 +483,7 @@ class SMCTradingBot:
         logger.info(f"Active Strategies: {active}")
         logger.info("============================================================")
         
-        # Enforce max 3 positions regardless of config
-        MAX_POSITIONS = 3
+        symbols_to_scan = self._make_symbols_to_scan(symbols)
         
         while True:
             try:
@@ -210,8 +495,14 @@ class SMCTradingBot:
                     continue
                 
                 # 2. Check open positions (Take Profit / Stop Loss is handled by Mudrex/Exchange)
-                open_positions = self.executor.get_open_positions()
-                current_count = len(open_positions)
+                # Reconcile the position count once per cycle
+                if self.dry_run:
+                    # Close paper positions on TP/SL and count the rest, so
+                    # dry-run respects the same position limit as live
+                    self.monitor_positions()
+                    self._open_count = current_count = len(self.current_positions)
+                else:
+                    self._open_count = current_count = len(self.executor.get_open_positions())
                 
                 # Log position status
                 logger.info(f"📊 Open positions: {current_count}/{MAX_POSITIONS}")
@@ -225,42 +516,25 @@ class SMCTradingBot:
                     time.sleep(60)
                     continue
                 
-                logger.info(f"🔍 Scanning {len(symbols)} symbols for SMC setups...")
+                scan_symbols = symbols_to_scan()
+                if not scan_symbols:
+                    logger.info("⏳ No new closed bars since last scan. Waiting for next cycle...")
+                    time.sleep(self._check_interval)
+                    continue
                 
-                for i, symbol in enumerate(symbols):
-                    # Progress log every 25 symbols
-                    if i > 0 and i % 25 == 0:
-                        logger.info(f"   Progress: {i}/{len(symbols)}...")
-                    
-                    # Re-check position count before scanning each symbol
-                    current_positions = len(self.executor.get_open_positions())
-                    if current_positions >= MAX_POSITIONS:
-                        logger.info(f"⏳ Max positions reached ({current_positions}/{MAX_POSITIONS}). Stopping scan.")
-                        break
-                    
-                    # Check cooldown before each potential trade
-                    in_cooldown, _ = self.executor.is_in_cooldown()
-                    if in_cooldown:
-                        logger.info("⏳ Balance cooldown activated. Stopping scan.")
-                        break
-                        
-                    # Scan
-                    side, details = self.scan_symbol(symbol)
-                    
-                    if side:
-                        self.execute_signal(symbol, side, details)
-                            
-                    # Rate limit scan delay
-                    time.sleep(self.config["mudrex"]["scan_delay_ms"] / 1000)
+                logger.info(f"🔍 Scanning {len(scan_symbols)} symbols for SMC setups...")
+                
+                self._scan_batch(scan_symbols)
                     
                 logger.info("⏳ Scan complete. Waiting for next cycle...")
                 
                 # Wait for next cycle
-                time.sleep(self.config["bot"]["check_interval_seconds"])
+                time.sleep(self._check_interval)
                 
             except KeyboardInterrupt:
                 logger.info("\n👋 Bot stopped by user")
                 self.tracker.print_summary()
+                self.tracker.close()
                 break
             except Exception as e:
                 logger.error(f"Main loop error: {e}")
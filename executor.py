@@ -2,10 +2,13 @@
 Mudrex Trade Executor - Execute trades using the SDK.
 """
 
+import json
 import logging
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 from mudrex import MudrexClient
 from mudrex.models import Order, Position
 from mudrex.utils import calculate_order_from_usd
@@ -16,10 +19,29 @@ logger = logging.getLogger(__name__)
 # Cooldown duration after insufficient balance error
 BALANCE_COOLDOWN_HOURS = 1
 
+# Seconds a symbol's quantity step is reused before re-fetching
+ASSET_CACHE_TTL = 3600
+
+# Tradable symbol list - persisted so a restart within the TTL skips the
+# fetch (the bot itself reads the list once at startup)
+SYMBOLS_CACHE_TTL = 3600
+SYMBOLS_CACHE_FILE = "symbols_cache.json"
+
+# Seconds an open-positions snapshot is reused (dropped on any order/close)
+POSITIONS_CACHE_TTL = 1.0
+
+# Polling for a new position before setting SL/TP: first delay, cap, total budget (s)
+SLTP_POLL_INITIAL = 0.05
+SLTP_POLL_MAX_DELAY = 0.5
+SLTP_POLL_TIMEOUT = 3.0
+
 
 class MudrexExecutor:
     """Execute trades on Mudrex with the SDK."""
     
+    # Error text that indicates an insufficient balance
+    _BALANCE_ERROR_RE = re.compile(r"insufficient|balance|margin|not enough", re.IGNORECASE)
+    
     def __init__(
         self,
         api_secret: str,
@@ -38,8 +60,26 @@ class MudrexExecutor:
         self.margin_per_trade = margin_per_trade
         self.max_leverage = max_leverage
         
-        # Cooldown tracking - don't attempt orders until this time
-        self._balance_cooldown_until: Optional[datetime] = None
+        # Cooldown tracking - don't attempt orders until this time.monotonic() deadline
+        self._balance_cooldown_until = 0.0
+        
+        # symbol -> (quantity_step, fetched_at monotonic)
+        self._asset_cache: Dict[str, Tuple[float, float]] = {}
+        
+        # Symbol list and its fetch time (wall clock, survives restarts)
+        self._symbols_cache: Optional[list] = None
+        self._symbols_ts = 0.0
+        
+        # Last positions.list_open() result, indexed by symbol, and its fetch time
+        self._positions_cache: Optional[list] = None
+        self._positions_by_symbol: Dict[str, Position] = {}
+        self._positions_ts = 0.0
+        
+        # Shared market-data fetcher for entry prices (created on first use)
+        self._price_fetcher = None
+        
+        # Background REST calls that can overlap local work (leverage.set)
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mudrex-io")
         
         logger.info(f"Executor initialized - Margin/Trade: ${margin_per_trade}, Max Leverage: {max_leverage}x")
     
@@ -59,32 +99,36 @@ class MudrexExecutor:
         Returns:
             (is_in_cooldown, minutes_remaining)
         """
-        if self._balance_cooldown_until is None:
-            return False, 0
-        
-        now = datetime.now()
-        if now < self._balance_cooldown_until:
-            remaining = (self._balance_cooldown_until - now).total_seconds() / 60
-            return True, int(remaining)
-        
-        # Cooldown expired
-        self._balance_cooldown_until = None
+        remaining = self._balance_cooldown_until - time.monotonic()
+        if remaining > 0:
+            return True, int(remaining / 60)
         return False, 0
     
     def activate_cooldown(self):
         """Activate 1-hour cooldown after insufficient balance error."""
-        self._balance_cooldown_until = datetime.now() + timedelta(hours=BALANCE_COOLDOWN_HOURS)
-        logger.warning(f"⚠️ Balance cooldown activated for {BALANCE_COOLDOWN_HOURS} hour(s) - no orders until {self._balance_cooldown_until.strftime('%H:%M:%S')}")
+        self._balance_cooldown_until = time.monotonic() + BALANCE_COOLDOWN_HOURS * 3600
+        resume_at = datetime.now() + timedelta(hours=BALANCE_COOLDOWN_HOURS)
+        logger.warning(f"⚠️ Balance cooldown activated for {BALANCE_COOLDOWN_HOURS} hour(s) - no orders until {resume_at.strftime('%H:%M:%S')}")
     
     def _is_insufficient_balance_error(self, error: Exception) -> bool:
         """Check if an error is due to insufficient balance."""
-        error_str = str(error).lower()
-        return any(term in error_str for term in [
-            "insufficient",
-            "balance",
-            "margin",
-            "not enough"
-        ])
+        return self._BALANCE_ERROR_RE.search(str(error)) is not None
+    
+    def _get_quantity_step(self, symbol: str) -> float:
+        """Quantity step for a symbol, cached for ASSET_CACHE_TTL seconds."""
+        cached = self._asset_cache.get(symbol)
+        if cached and time.monotonic() - cached[1] < ASSET_CACHE_TTL:
+            return cached[0]
+        
+        try:
+            asset = self.client.assets.get(symbol)
+            quantity_step = float(asset.quantity_step)
+        except Exception as e:
+            logger.error(f"Failed to get asset info: {e}")
+            return 0.001  # Not cached - retry on the next order
+        
+        self._asset_cache[symbol] = (quantity_step, time.monotonic())
+        return quantity_step
     
     def calculate_position_size(
         self,
@@ -103,12 +147,7 @@ class MudrexExecutor:
         Returns:
             (quantity_str, usd_value)
         """
-        try:
-            asset = self.client.assets.get(symbol)
-            quantity_step = float(asset.quantity_step)
-        except Exception as e:
-            logger.error(f"Failed to get asset info: {e}")
-            quantity_step = 0.001
+        quantity_step = self._get_quantity_step(symbol)
         
         # Calculate from margin per trade * leverage
         notional_value = self.margin_per_trade * leverage
@@ -154,9 +193,16 @@ class MudrexExecutor:
         try:
             actual_leverage = min(leverage, self.max_leverage)
             
+            # Set leverage in the background while pricing and sizing the order
+            leverage_set = self._io_pool.submit(
+                self.client.leverage.set,
+                symbol=symbol,
+                leverage=str(actual_leverage),
+                margin_type="ISOLATED"
+            )
+            
             if not entry_price:
-                from market_data import BybitDataFetcher
-                entry_price = BybitDataFetcher().get_current_price(symbol)
+                entry_price = self._get_entry_price(symbol)
                 if not entry_price:
                     logger.error("Failed to get current price")
                     return None
@@ -164,17 +210,15 @@ class MudrexExecutor:
             # Calculate quantity
             qty, value = self.calculate_position_size(symbol, entry_price, actual_leverage)
             
-            logger.info(f"📊 Position sizing: margin=${self.margin_per_trade}, leverage={actual_leverage}x")
-            logger.info(f"   Notional: ${self.margin_per_trade * actual_leverage:.2f}")
-            logger.info(f"Placing {side} order: {qty} {symbol} @ ${entry_price:,.4f} (${value:,.2f})")
-            logger.info(f"TP: ${tp:,.4f}, SL: ${sl:,.4f}")
+            # Skip the number formatting entirely when INFO is filtered out
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"📊 Position sizing: margin=${self.margin_per_trade}, leverage={actual_leverage}x")
+                logger.info(f"   Notional: ${self.margin_per_trade * actual_leverage:.2f}")
+                logger.info(f"Placing {side} order: {qty} {symbol} @ ${entry_price:,.4f} (${value:,.2f})")
+                logger.info(f"TP: ${tp:,.4f}, SL: ${sl:,.4f}")
             
-            # Set leverage
-            self.client.leverage.set(
-                symbol=symbol,
-                leverage=str(actual_leverage),
-                margin_type="ISOLATED"
-            )
+            # Leverage must be applied before the order goes in
+            leverage_set.result(timeout=10)
             
             # Place market order
             order = self.client.orders.create_market_order(
@@ -183,6 +227,7 @@ class MudrexExecutor:
                 quantity=qty,
                 leverage=str(actual_leverage)
             )
+            self._invalidate_positions()
             
             logger.info(f"✅ Order placed: {order.order_id if hasattr(order, 'order_id') else 'N/A'}")
             
@@ -200,6 +245,16 @@ class MudrexExecutor:
             
             return None
     
+    def _get_entry_price(self, symbol: str) -> Optional[float]:
+        """
+        Current price via the bot's shared fetcher, which answers from the
+        WebSocket ticker or a fresh bulk-tickers snapshot before going to REST.
+        """
+        if self._price_fetcher is None:
+            from market_data import get_shared_fetcher
+            self._price_fetcher = get_shared_fetcher()
+        return self._price_fetcher.get_current_price(symbol)
+    
     def place_market_order(
         self,
         symbol: str,
@@ -219,48 +274,82 @@ class MudrexExecutor:
     def _set_sltp(self, symbol: str, sl: float, tp: float):
         """Set SL/TP on position with fallback logic."""
         try:
-            time.sleep(1)  # Wait for position to be created
-            positions = self.client.positions.list_open()
+            pos = self._wait_for_position(symbol)
+            if pos is None:
+                logger.warning(f"⚠️ Position for {symbol} not visible after {SLTP_POLL_TIMEOUT}s - SL/TP not set")
+                return
             
-            for pos in positions:
-                if pos.symbol == symbol:
-                    # Try setting both together first
-                    try:
-                        self.client.positions.set_risk_order(
-                            position_id=pos.position_id,
-                            stoploss_price=str(sl),
-                            takeprofit_price=str(tp)
-                        )
-                        logger.info(f"✅ SL/TP set: SL=${sl:.4f}, TP=${tp:.4f}")
-                    except Exception as e1:
-                        logger.warning(f"⚠️ Combined SL/TP failed, trying separately: {e1}")
-                        
-                        # Try separately
-                        try:
-                            self.client.positions.set_risk_order(
-                                position_id=pos.position_id,
-                                takeprofit_price=str(tp)
-                            )
-                            logger.info(f"✅ TP set: ${tp:.4f}")
-                        except Exception as e2:
-                            logger.warning(f"⚠️ TP failed: {e2}")
-                        
-                        try:
-                            self.client.positions.set_risk_order(
-                                position_id=pos.position_id,
-                                stoploss_price=str(sl)
-                            )
-                            logger.info(f"✅ SL set: ${sl:.4f}")
-                        except Exception as e3:
-                            logger.warning(f"⚠️ SL failed: {e3}")
-                    break
+            # Try setting both together first
+            try:
+                self.client.positions.set_risk_order(
+                    position_id=pos.position_id,
+                    stoploss_price=str(sl),
+                    takeprofit_price=str(tp)
+                )
+                logger.info(f"✅ SL/TP set: SL=${sl:.4f}, TP=${tp:.4f}")
+            except Exception as e1:
+                logger.warning(f"⚠️ Combined SL/TP failed, trying separately: {e1}")
+                
+                # Try separately
+                try:
+                    self.client.positions.set_risk_order(
+                        position_id=pos.position_id,
+                        takeprofit_price=str(tp)
+                    )
+                    logger.info(f"✅ TP set: ${tp:.4f}")
+                except Exception as e2:
+                    logger.warning(f"⚠️ TP failed: {e2}")
+                
+                try:
+                    self.client.positions.set_risk_order(
+                        position_id=pos.position_id,
+                        stoploss_price=str(sl)
+                    )
+                    logger.info(f"✅ SL set: ${sl:.4f}")
+                except Exception as e3:
+                    logger.warning(f"⚠️ SL failed: {e3}")
         except Exception as e:
             logger.warning(f"⚠️ Failed to set SL/TP: {e}")
     
+    def _wait_for_position(self, symbol: str) -> Optional[Position]:
+        """Poll with backoff until symbol's new position shows up, or time out."""
+        start = time.monotonic()
+        delay = SLTP_POLL_INITIAL
+        while True:
+            time.sleep(delay)
+            self._get_positions(force=True)
+            pos = self._positions_by_symbol.get(symbol)
+            if pos is not None:
+                logger.info(f"   Position visible after {time.monotonic() - start:.2f}s")
+                return pos
+            delay = min(delay * 2, SLTP_POLL_MAX_DELAY)
+            if time.monotonic() - start + delay > SLTP_POLL_TIMEOUT:
+                return None
+    
+    def _get_positions(self, force: bool = False) -> list:
+        """
+        Open positions, reusing a snapshot younger than POSITIONS_CACHE_TTL.
+        
+        Raises whatever the SDK raises; callers handle errors.
+        """
+        now = time.monotonic()
+        if not force and self._positions_cache is not None and now - self._positions_ts < POSITIONS_CACHE_TTL:
+            return self._positions_cache
+        
+        self._positions_cache = self.client.positions.list_open()
+        self._positions_by_symbol = {pos.symbol: pos for pos in self._positions_cache}
+        self._positions_ts = now
+        return self._positions_cache
+    
+    def _invalidate_positions(self):
+        """Drop the positions snapshot after a mutating call."""
+        self._positions_cache = None
+        self._positions_by_symbol = {}
+    
     def get_open_positions(self) -> list:
         """Get all open positions."""
         try:
-            return self.client.positions.list_open()
+            return self._get_positions()
         except Exception as e:
             logger.error(f"Failed to get positions: {e}")
             return []
@@ -268,11 +357,8 @@ class MudrexExecutor:
     def get_position_for_symbol(self, symbol: str) -> Optional[Position]:
         """Check if there's an open position for this symbol."""
         try:
-            positions = self.client.positions.list_open()
-            for pos in positions:
-                if pos.symbol == symbol:
-                    return pos
-            return None
+            self._get_positions()
+            return self._positions_by_symbol.get(symbol)
         except Exception as e:
             logger.error(f"Failed to check positions: {e}")
             return None
@@ -288,6 +374,7 @@ class MudrexExecutor:
             # Use SDK close method if available
             try:
                 self.client.positions.close(position.position_id)
+                self._invalidate_positions()
                 logger.info(f"✅ Position closed: {symbol}")
                 return True
             except:
@@ -301,6 +388,7 @@ class MudrexExecutor:
                     leverage=position.leverage,
                     reduce_only=True
                 )
+                self._invalidate_positions()
                 
                 logger.info(f"✅ Position closed via reverse order: {symbol}")
                 return True
@@ -310,19 +398,54 @@ class MudrexExecutor:
             return False
     
     def get_available_symbols(self) -> list:
-        """Get list of available trading symbols."""
+        """
+        Get list of available trading symbols (cached for SYMBOLS_CACHE_TTL).
+        
+        The bot calls this once at startup, so in practice the TTL decides
+        whether a restart reuses SYMBOLS_CACHE_FILE or re-fetches the list.
+        """
+        if self._symbols_cache is None:
+            self._load_symbols_cache()
+        
+        if self._symbols_cache and time.time() - self._symbols_ts < SYMBOLS_CACHE_TTL:
+            return self._symbols_cache
+        
+        return self.refresh_symbols()
+    
+    def refresh_symbols(self) -> list:
+        """Re-fetch the symbol list, bypassing the cache."""
         try:
             assets = self.client.assets.list_all()
-            return [a.symbol for a in assets if a.symbol]
+            symbols = [a.symbol for a in assets if a.symbol]
         except Exception as e:
             logger.error(f"Failed to get assets: {e}")
+            if self._symbols_cache:
+                return self._symbols_cache  # Stale beats the short fallback list
             # Fallback to common symbols
             return ["BTCUSDT", "ETHUSDT", "SOLUSDT", "DOGEUSDT", "XRPUSDT", "ADAUSDT"]
+        
+        self._symbols_cache = symbols
+        self._symbols_ts = time.time()
+        try:
+            with open(SYMBOLS_CACHE_FILE, "w") as f:
+                json.dump({"fetched_at": self._symbols_ts, "symbols": symbols}, f)
+        except OSError as e:
+            logger.warning(f"Failed to persist symbol cache: {e}")
+        
+        return symbols
+    
+    def _load_symbols_cache(self):
+        """Warm-start the symbol cache from disk."""
+        try:
+            with open(SYMBOLS_CACHE_FILE, "r") as f:
+                data = json.load(f)
+            self._symbols_cache = data["symbols"]
+            self._symbols_ts = float(data["fetched_at"])
+        except (OSError, ValueError, KeyError):
+            self._symbols_cache = []
 
 if __name__ == "__main__":
     # Test
-    import json
-    
     with open("config.json", "r") as f:
         config = json.load(f)
     
@@ -1,44 +1,498 @@
 """
 Market Data Fetcher - Fetch OHLCV data from Bybit REST API.
 Uses direct requests instead of pybit for Python 3.14 compatibility.
+Optionally keeps klines current from Bybit's public WebSocket stream.
 """
 
+import json
 import logging
+import threading
 import time
-from typing import Optional
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# websocket-client is optional - without it klines are always polled over REST
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+# orjson is optional - faster parsing of REST responses and stream messages
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
+
+# httpx is optional - with its http2 extra, REST calls can share one
+# multiplexed HTTP/2 connection (see BybitDataFetcher(http2=True))
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def interval_seconds(interval: str) -> Optional[int]:
+    """Bar length for a Bybit interval, or None if bars aren't fixed-length from epoch."""
+    if interval.isdigit():
+        return int(interval) * 60
+    if interval == "D":
+        return 86400
+    return None  # "W" bars start on Mondays, "M" varies in length
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter."""
+    
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Initialize the bucket full.
+        
+        Args:
+            rate: Tokens refilled per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+    
+    def _reserve(self) -> float:
+        """Take a token (possibly on credit) and return seconds until it's valid."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+    
+    def acquire(self):
+        """Take one token, sleeping only as long as needed for it to refill."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+
+@dataclass
+class Bars:
+    """OHLCV bars as parallel NumPy arrays, oldest first."""
+    
+    ts: np.ndarray  # Bar start time (ms)
+    o: np.ndarray
+    h: np.ndarray
+    l: np.ndarray
+    c: np.ndarray
+    v: np.ndarray
+    
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "Bars":
+        """Split [start_ms, open, high, low, close, volume] rows into columns."""
+        cols = np.ascontiguousarray(rows.T)
+        return cls(*cols)
+    
+    def __len__(self) -> int:
+        return self.c.size
+    
+    def __getitem__(self, key: slice) -> "Bars":
+        """Slice all columns (views, no copy)."""
+        return Bars(self.ts[key], self.o[key], self.h[key], self.l[key], self.c[key], self.v[key])
+    
+    def to_frame(self, dtype=np.float64, time_index: bool = False) -> pd.DataFrame:
+        """
+        Materialize as a DataFrame.
+        
+        The defaults give the layout smartmoneyconcepts expects: float64
+        columns, a RangeIndex and a timestamp column.
+        
+        Args:
+            dtype: dtype of the OHLCV columns
+            time_index: Use the timestamps as a DatetimeIndex instead of a column
+        """
+        timestamps = pd.to_datetime(self.ts.astype(np.int64), unit="ms")
+        columns = {
+            "open": self.o.astype(dtype, copy=False),
+            "high": self.h.astype(dtype, copy=False),
+            "low": self.l.astype(dtype, copy=False),
+            "close": self.c.astype(dtype, copy=False),
+            "volume": self.v.astype(dtype, copy=False)
+        }
+        if time_index:
+            return pd.DataFrame(columns, index=pd.DatetimeIndex(timestamps, name="timestamp"))
+        return pd.DataFrame({"timestamp": timestamps, **columns})
+
+
+class KlineBuffer:
+    """
+    Preallocated buffer of recent klines for one symbol.
+    
+    Rows are [start_ms, open, high, low, close, volume], oldest first.
+    `rows` lets several buffers share one block (see
+    BybitDataFetcher.preallocate).
+    """
+    
+    DEFAULT_CAPACITY = 300
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, rows: Optional[np.ndarray] = None):
+        self._rows = rows if rows is not None else np.zeros((capacity, 6), dtype=np.float64)
+        self.size = 0
+    
+    @property
+    def capacity(self) -> int:
+        return len(self._rows)
+    
+    @property
+    def last_start(self) -> float:
+        """Start time (ms) of the newest bar."""
+        return self._rows[self.size - 1, 0] if self.size else 0.0
+    
+    def load(self, rows: np.ndarray):
+        """Replace the buffer contents (rows oldest first)."""
+        rows = rows[-len(self._rows):]
+        self._rows[:len(rows)] = rows
+        self.size = len(rows)
+    
+    def update(self, row):
+        """Apply a newer kline: overwrite the open bar or append a new one."""
+        if self.size:
+            last_start = self._rows[self.size - 1, 0]
+            if row[0] < last_start:
+                return  # Out-of-order update
+            if row[0] == last_start:
+                self._rows[self.size - 1] = row
+                return
+        
+        if self.size == len(self._rows):
+            # Full - drop the oldest bar
+            self._rows[:-1] = self._rows[1:]
+            self.size -= 1
+        self._rows[self.size] = row
+        self.size += 1
+    
+    def tail(self, n: int) -> np.ndarray:
+        """Copy of the newest n rows."""
+        return self._rows[max(self.size - n, 0):self.size].copy()
+
+
+class BybitKlineStream:
+    """
+    Keep per-symbol KlineBuffers current from Bybit's public kline WebSocket.
+    
+    The buffers are shared with BybitDataFetcher's REST windows, so both
+    write under the same lock. Optionally also tracks last prices from the
+    tickers topic.
+    """
+    
+    WS_URL = "wss://stream.bybit.com/v5/public/linear"
+    SUBSCRIBE_BATCH = 10  # Topics per subscribe message
+    STALE_AFTER = 120  # Seconds without an update before a buffer is not trusted
+    PRICE_STALE_AFTER = 10  # Seconds before a streamed last price is not trusted
+    
+    def __init__(
+        self,
+        buffers: Dict[str, KlineBuffer],
+        interval: str,
+        lock: threading.Lock,
+        tickers: bool = False
+    ):
+        self.interval = interval
+        self.buffers = buffers
+        self.tickers = tickers
+        self._lock = lock
+        self._received_at: Dict[str, float] = {}  # Last update per symbol
+        self._prices: Dict[str, Tuple[float, float]] = {}  # symbol -> (last price, received_at)
+        self._ws = None
+        self._running = False
+    
+    def start(self):
+        """Connect in a background thread (reconnects until stopped)."""
+        self._running = True
+        threading.Thread(target=self._run, name="kline-stream", daemon=True).start()
+    
+    def stop(self):
+        """Close the connection and stop reconnecting."""
+        self._running = False
+        if self._ws:
+            self._ws.close()
+    
+    def _run(self):
+        while self._running:
+            self._ws = websocket.WebSocketApp(
+                self.WS_URL,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error
+            )
+            self._ws.run_forever(ping_interval=20, ping_timeout=10)
+            if self._running:
+                logger.warning("Kline stream disconnected, reconnecting in 5s...")
+                time.sleep(5)
+    
+    def _on_open(self, ws):
+        # Bars may have been missed while disconnected - let REST re-seed
+        with self._lock:
+            for buf in self.buffers.values():
+                buf.size = 0
+        
+        topics = [f"kline.{self.interval}.{symbol}" for symbol in self.buffers]
+        if self.tickers:
+            topics += [f"tickers.{symbol}" for symbol in self.buffers]
+        for i in range(0, len(topics), self.SUBSCRIBE_BATCH):
+            ws.send(json.dumps({"op": "subscribe", "args": topics[i:i + self.SUBSCRIBE_BATCH]}))
+        logger.info(f"📡 Kline stream subscribed to {len(self.buffers)} symbols")
+    
+    def _on_message(self, ws, message):
+        msg = _loads(message)
+        topic = msg.get("topic", "")
+        if topic.startswith("tickers."):
+            # Deltas only carry changed fields
+            last_price = msg.get("data", {}).get("lastPrice")
+            if last_price:
+                self._prices[topic[8:]] = (float(last_price), time.monotonic())
+            return
+        if not topic.startswith("kline."):
+            return  # Subscription acks, pongs
+        
+        symbol = topic.rsplit(".", 1)[1]
+        buf = self.buffers.get(symbol)
+        if buf is None:
+            return
+        
+        with self._lock:
+            for k in msg.get("data", []):
+                buf.update((
+                    float(k["start"]), float(k["open"]), float(k["high"]),
+                    float(k["low"]), float(k["close"]), float(k["volume"])
+                ))
+            self._received_at[symbol] = time.monotonic()
+    
+    def _on_error(self, ws, error):
+        logger.error(f"Kline stream error: {error}")
+    
+    def get(self, symbol: str, limit: int) -> Optional[np.ndarray]:
+        """Newest `limit` rows for symbol, or None if not buffered or stale."""
+        buf = self.buffers.get(symbol)
+        if buf is None:
+            return None
+        
+        with self._lock:
+            received_at = self._received_at.get(symbol, 0.0)
+            if buf.size < limit or time.monotonic() - received_at > self.STALE_AFTER:
+                return None
+            return buf.tail(limit)
+    
+    def price(self, symbol: str) -> Optional[float]:
+        """Last streamed price for symbol, or None if not streamed or stale."""
+        entry = self._prices.get(symbol)
+        if entry is None or time.monotonic() - entry[1] > self.PRICE_STALE_AFTER:
+            return None
+        return entry[0]
+
+
 class BybitDataFetcher:
     """Fetch market data from Bybit public REST API."""
     
     BASE_URL = "https://api.bybit.com"
+    INCREMENTAL_LIMIT = 2  # Bars requested to update a warm window (open + last closed)
+    TICKERS_TTL = 1.0  # Seconds a bulk tickers snapshot is reused
+    POOL_MAXSIZE = 32  # Keep-alive connections (>= scan workers)
+    REQUEST_RATE = 20  # Sustained requests/s (Bybit allows 120/s per IP on public v5)
+    REQUEST_BURST = 20  # Requests allowed back-to-back before pacing kicks in
     
-    def __init__(self):
-        """Initialize with rate limiting."""
-        self._last_request_time = 0
-        self._min_request_interval = 0.1  # 100ms between requests
-        self.session = requests.Session()
+    def __init__(self, http2: bool = False):
+        """
+        Initialize with rate limiting.
+        
+        Args:
+            http2: Use an HTTP/2 httpx client when httpx[http2] is installed
+        """
+        # Shared by scan worker threads and coroutines
+        self._bucket = TokenBucket(rate=self.REQUEST_RATE, capacity=self.REQUEST_BURST)
+        self.session = self._make_session(http2)
+        self.stream: Optional[BybitKlineStream] = None
+        
+        # Per (symbol, interval) kline windows for incremental REST updates
+        self._windows: Dict[Tuple[str, str], KlineBuffer] = {}
+        self._windows_lock = threading.Lock()
+        self._block: Optional[np.ndarray] = None
+        
+        # Last bulk tickers snapshot (symbol -> last price)
+        self._tickers: Dict[str, float] = {}
+        self._tickers_at = 0.0
+    
+    def _make_session(self, http2: bool):
+        """HTTP client for REST calls - both expose get(url, params=, timeout=)."""
+        if http2 and httpx is not None:
+            try:
+                # Only connection errors are retried here, not 429/5xx
+                return httpx.Client(
+                    transport=httpx.HTTPTransport(
+                        http2=True,
+                        retries=3,
+                        limits=httpx.Limits(
+                            max_connections=self.POOL_MAXSIZE,
+                            max_keepalive_connections=self.POOL_MAXSIZE,
+                            keepalive_expiry=60
+                        )
+                    ),
+                    timeout=10
+                )
+            except ImportError:
+                logger.warning("httpx http2 extra not installed - using requests")
+        elif http2:
+            logger.warning("httpx not installed - using requests")
+        
+        session = requests.Session()
+        # Pool enough connections for concurrent scans and retry transient
+        # failures (429/5xx) with backoff instead of dropping the symbol
+        retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+        session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_MAXSIZE, max_retries=retry)
+        )
+        return session
+    
+    def warm_up(self):
+        """Open the Bybit connection (DNS + TLS) before the first scan needs it."""
+        try:
+            self.session.get(f"{self.BASE_URL}/v5/market/time", timeout=10)
+        except Exception as e:
+            logger.warning(f"Bybit connection warm-up failed: {e}")
+    
+    def preallocate(self, symbols: List[str], interval: str, capacity: int = KlineBuffer.DEFAULT_CAPACITY):
+        """
+        Back the kline windows of these symbols with one preallocated block.
+        
+        Full fetches then reload the same rows instead of allocating a new
+        buffer per symbol.
+        """
+        self._block = np.zeros((len(symbols), capacity, 6), dtype=np.float64)
+        with self._windows_lock:
+            for i, symbol in enumerate(symbols):
+                self._windows[(symbol, interval)] = KlineBuffer(rows=self._block[i])
+    
+    def start_kline_stream(self, symbols: List[str], interval: str, tickers: bool = False) -> bool:
+        """
+        Serve get_klines (and get_current_price, with tickers) for these
+        symbols from the WebSocket stream.
+        
+        Tickers are off by default: Bybit pushes them every ~100ms per
+        symbol, far more parsing than the occasional order-price lookup
+        saves over the bulk tickers snapshot.
+        """
+        if websocket is None:
+            logger.warning("websocket-client not installed - polling klines over REST")
+            return False
+        
+        with self._windows_lock:
+            buffers = {s: self._windows.setdefault((s, interval), KlineBuffer()) for s in symbols}
+        self.stream = BybitKlineStream(buffers, interval, self._windows_lock, tickers=tickers)
+        self.stream.start()
+        return True
     
     def _rate_limit(self):
-        """Simple rate limiting."""
-        elapsed = time.time() - self._last_request_time
-        if elapsed < self._min_request_interval:
-            time.sleep(self._min_request_interval - elapsed)
-        self._last_request_time = time.time()
+        """Token-bucket rate limiting (thread-safe)."""
+        self._bucket.acquire()
     
-    def get_klines(
+    def _kline_params(self, symbol: str, interval: str, limit: int) -> dict:
+        return {
+            "category": "linear",
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+    
+    @staticmethod
+    def _parse_klines(data: dict) -> Optional[list]:
+        if data.get("retCode") != 0:
+            logger.error(f"Bybit API error: {data.get('retMsg')}")
+            return None
+        return data.get("result", {}).get("list", []) or None
+    
+    @staticmethod
+    def _klines_to_rows(klines: list) -> np.ndarray:
+        """
+        Kline rows oldest first as float64 [start_ms, open, high, low, close, volume].
+        
+        Bybit returns newest first: [startTime, open, high, low, close, volume, turnover].
+        Converting the whole string matrix in one call and reversing the
+        result is cheaper than slicing and reversing the lists first.
+        """
+        rows = np.array(klines, dtype=np.float64)[::-1, :6]
+        if len(rows) > 1 and rows[0, 0] > rows[-1, 0]:
+            # Response came back oldest-first - fall back to a real sort
+            rows = rows[np.argsort(rows[:, 0], kind="stable")]
+        return rows
+    
+    def _request_klines(self, symbol: str, interval: str, limit: int) -> Optional[list]:
+        """Raw kline rows from REST (newest first), or None on error."""
+        self._rate_limit()
+        
+        url = f"{self.BASE_URL}/v5/market/kline"
+        response = self.session.get(url, params=self._kline_params(symbol, interval, limit), timeout=10)
+        return self._parse_klines(_loads(response.content))
+    
+    def _streamed_bars(self, symbol: str, interval: str, limit: int) -> Optional[Bars]:
+        """Bars from the WebSocket buffer when it's warm."""
+        if self.stream and self.stream.interval == interval:
+            rows = self.stream.get(symbol, limit)
+            if rows is not None:
+                return Bars.from_rows(rows)
+        return None
+    
+    def _warm_window(self, symbol: str, interval: str, limit: int) -> Optional[KlineBuffer]:
+        window = self._windows.get((symbol, interval))
+        return window if window is not None and window.size >= limit else None
+    
+    def _merge_window(self, window: KlineBuffer, klines: Optional[list], limit: int) -> Optional[Bars]:
+        """Merge the newest bars into a warm window. None on a gap."""
+        if not klines:
+            return None
+        
+        rows = self._klines_to_rows(klines)
+        with self._windows_lock:
+            if rows[0, 0] > window.last_start:
+                return None  # Missed bars in between - needs a full fetch
+            for row in rows:
+                window.update(row)
+            return Bars.from_rows(window.tail(limit))
+    
+    def _store_klines(self, symbol: str, interval: str, limit: int, klines: list) -> Bars:
+        """Parse a full REST response and keep it for incremental updates."""
+        rows = self._klines_to_rows(klines)
+        
+        with self._windows_lock:
+            window = self._windows.get((symbol, interval))
+            if window is None or window.capacity < len(rows):
+                window = KlineBuffer(max(limit, KlineBuffer.DEFAULT_CAPACITY))
+                self._windows[(symbol, interval)] = window
+            window.load(rows)
+        
+        return Bars.from_rows(rows)
+    
+    def get_bars(
         self,
         symbol: str,
         interval: str = "15",
         limit: int = 200
-    ) -> Optional[pd.DataFrame]:
+    ) -> Optional[Bars]:
         """
-        Fetch kline/candlestick data.
+        Fetch kline/candlestick data as NumPy arrays.
+        
+        After the first full fetch, only the newest bars are requested and
+        merged into a per-symbol window.
         
         Args:
             symbol: Trading pair (e.g., "BTCUSDT")
@@ -46,55 +500,62 @@ class BybitDataFetcher:
             limit: Number of candles (max 1000)
         
         Returns:
-            DataFrame with columns: open, high, low, close, volume
+            Bars (oldest first), or None on error
         """
-        self._rate_limit()
+        bars = self._streamed_bars(symbol, interval, limit)
+        if bars is not None:
+            return bars
         
         try:
-            url = f"{self.BASE_URL}/v5/market/kline"
-            params = {
-                "category": "linear",
-                "symbol": symbol,
-                "interval": interval,
-                "limit": limit
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            if data.get("retCode") != 0:
-                logger.error(f"Bybit API error: {data.get('retMsg')}")
-                return None
-            
-            klines = data.get("result", {}).get("list", [])
-            if not klines:
-                return None
-            
-            # Convert to DataFrame
-            # Bybit returns: [startTime, open, high, low, close, volume, turnover]
-            df = pd.DataFrame(klines, columns=[
-                "timestamp", "open", "high", "low", "close", "volume", "turnover"
-            ])
+            window = self._warm_window(symbol, interval, limit)
+            if window is not None:
+                klines = self._request_klines(symbol, interval, self.INCREMENTAL_LIMIT)
+                bars = self._merge_window(window, klines, limit)
+                if bars is not None:
+                    return bars
             
-            # Convert types
-            df["timestamp"] = pd.to_datetime(df["timestamp"].astype(int), unit="ms")
-            for col in ["open", "high", "low", "close", "volume"]:
-                df[col] = df[col].astype(float)
-            
-            # Sort by time ascending (Bybit returns newest first)
-            df = df.sort_values("timestamp").reset_index(drop=True)
-            
-            # Keep only OHLCV columns (SMC expects lowercase)
-            df = df[["timestamp", "open", "high", "low", "close", "volume"]]
-            
-            return df
+            klines = self._request_klines(symbol, interval, limit)
+            return self._store_klines(symbol, interval, limit, klines) if klines else None
             
         except Exception as e:
             logger.error(f"Failed to fetch klines for {symbol}: {e}")
             return None
     
+    def get_klines(
+        self,
+        symbol: str,
+        interval: str = "15",
+        limit: int = 200,
+        dtype: str = "float32"
+    ) -> Optional[pd.DataFrame]:
+        """
+        Fetch kline/candlestick data.
+        
+        Args:
+            symbol: Trading pair (e.g., "BTCUSDT")
+            interval: Timeframe ("1", "5", "15", "60", "240", "D")
+            limit: Number of candles (max 1000)
+            dtype: Column dtype - "float64" for full precision
+        
+        Returns:
+            DataFrame indexed by timestamp with columns: open, high, low, close, volume
+        """
+        bars = self.get_bars(symbol, interval, limit)
+        return bars.to_frame(dtype, time_index=True) if bars is not None else None
+    
     def get_current_price(self, symbol: str) -> Optional[float]:
-        """Get current price for a symbol."""
+        """Get current price for a symbol (from the stream or the bulk tickers snapshot if possible)."""
+        if self.stream and self.stream.tickers:
+            price = self.stream.price(symbol)
+            if price is not None:
+                return price
+        
+        # One bulk call serves every lookup within TICKERS_TTL; the
+        # per-symbol request is only the fallback when it fails
+        tickers = self.get_all_tickers()
+        if tickers:
+            return tickers.get(symbol)
+        
         self._rate_limit()
         
         try:
@@ -105,7 +566,7 @@ class BybitDataFetcher:
             }
             
             response = self.session.get(url, params=params, timeout=10)
-            data = response.json()
+            data = _loads(response.content)
             
             if data.get("retCode") != 0:
                 return None
@@ -119,6 +580,57 @@ class BybitDataFetcher:
             logger.error(f"Failed to get price for {symbol}: {e}")
             return None
 
+    
+    def get_all_tickers(self) -> Dict[str, float]:
+        """
+        Last price of every linear symbol from a single tickers call.
+        
+        Snapshots are reused for TICKERS_TTL seconds.
+        
+        Returns:
+            {symbol: last_price}, empty on error
+        """
+        if time.monotonic() - self._tickers_at < self.TICKERS_TTL:
+            return self._tickers
+        
+        self._rate_limit()
+        
+        try:
+            url = f"{self.BASE_URL}/v5/market/tickers"
+            response = self.session.get(url, params={"category": "linear"}, timeout=10)
+            data = _loads(response.content)
+            
+            if data.get("retCode") != 0:
+                return {}
+            
+            self._tickers = {
+                t["symbol"]: float(t["lastPrice"])
+                for t in data.get("result", {}).get("list", [])
+            }
+            self._tickers_at = time.monotonic()
+            return self._tickers
+            
+        except Exception as e:
+            logger.error(f"Failed to get tickers: {e}")
+            return {}
+
+
+_shared_fetcher: Optional[BybitDataFetcher] = None
+_shared_fetcher_lock = threading.Lock()
+
+
+def get_shared_fetcher(**kwargs) -> BybitDataFetcher:
+    """
+    Process-wide BybitDataFetcher, so callers share one HTTP connection pool.
+    
+    kwargs are passed to BybitDataFetcher by the first call only.
+    """
+    global _shared_fetcher
+    with _shared_fetcher_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = BybitDataFetcher(**kwargs)
+        return _shared_fetcher
+
 
 if __name__ == "__main__":
     # Test
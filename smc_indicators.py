@@ -10,47 +10,206 @@ Calculates Smart Money Concepts indicators:
 - Liquidity levels
 """
 
+import contextlib
+import io
 import logging
+import math
+import threading
 import pandas as pd
 import numpy as np
-import sys
-import os
+from dataclasses import dataclass
+from typing import Optional, Tuple, TypedDict, Union
+from market_data import Bars
 
-# Suppress "Thank you for using SmartMoneyConcepts" message
+# smartmoneyconcepts is imported on first use (see _get_smc)
+_smc = None
+_smc_lock = threading.Lock()
+
+# Numba is optional - kernels run as plain Python without it
 try:
-    with open(os.devnull, 'w') as devnull:
-        old_stdout = sys.stdout
-        sys.stdout = devnull
-        try:
-            from smartmoneyconcepts import smc
-        finally:
-            sys.stdout = old_stdout
-except Exception:
-    # Fallback if suppression fails
-    from smartmoneyconcepts import smc
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def add_atr(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    """Add ATR indicator to DataFrame."""
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
+def _get_smc():
+    """
+    Import smartmoneyconcepts once, on first use.
+    
+    Keeps the import cost off `import smc_indicators` and swallows the
+    "Thank you for using SmartMoneyConcepts" banner. The lock keeps scan
+    threads from interleaving their stdout redirects.
+    """
+    global _smc
+    if _smc is None:
+        with _smc_lock:
+            if _smc is None:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    from smartmoneyconcepts import smc
+                _smc = smc
+    return _smc
+
+
+@dataclass
+class Zones:
+    """Active OBs or FVGs of one direction as parallel arrays, oldest first."""
     
-    tr1 = high - low
-    tr2 = abs(high - close.shift(1))
-    tr3 = abs(low - close.shift(1))
+    idx: np.ndarray  # Bar index the zone formed on
+    top: np.ndarray
+    bottom: np.ndarray
+    strength: Optional[np.ndarray] = None  # OB strength (%); None for FVGs
     
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    df[f"atr_{period}"] = tr.rolling(window=period).mean()
+    def __len__(self) -> int:
+        return self.idx.size
+
+
+class ZoneSet(TypedDict):
+    """get_active_order_blocks / get_active_fvgs result."""
+    bullish: Zones
+    bearish: Zones
+
+
+# (index, top, bottom) of a zone containing price
+ZoneHit = Tuple[int, float, float]
+
+
+class ZoneHits(TypedDict):
+    """find_active_zones result."""
+    bullish: Optional[ZoneHit]
+    bearish: Optional[ZoneHit]
+
+
+class Structure(TypedDict):
+    """get_latest_structure result."""
+    type: Optional[str]
+    direction: Optional[int]
+    level: Optional[float]
+    index: Optional[int]
+
+
+@njit("float64[:](float64[:], float64[:], float64[:], int64)", cache=True)
+def _atr_kernel(high, low, close, period):
+    """True range and its Wilder average in a single pass."""
+    n = high.size
+    atr = np.empty(n)
+    alpha = 1.0 / period
+    
+    for i in range(n):
+        tr = high[i] - low[i]
+        if i == 0:
+            atr[i] = tr  # Seeded with the first true range, like ewm(adjust=False)
+            continue
+        tr = max(tr, abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        atr[i] = atr[i - 1] + alpha * (tr - atr[i - 1])
+    
+    return atr
+
+
+def _atr_numpy(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """Vectorized _atr_kernel for when Numba isn't installed."""
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    
+    # fmax ignores the NaN previous close, so the first bar is just high - low
+    tr = np.fmax.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    
+    return pd.Series(tr).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+
+@njit(
+    "int64(float64[:], float64[:], float64[:], boolean[:], float64, float64, float64, float64)",
+    cache=True
+)
+def _zone_hit_kernel(kind, top, bottom, active, direction, price, bottom_mult, top_mult):
+    """Row of the first active zone of `direction` containing price, or -1."""
+    for i in range(kind.size):
+        if not active[i] or kind[i] != direction:
+            continue
+        if bottom[i] * bottom_mult <= price <= top[i] * top_mult:
+            return i
+    return -1
+
+
+@njit(
+    [
+        "UniTuple(float64, 2)(float32[:], float64[:], float64[:], float64[:], int64)",
+        "UniTuple(float64, 2)(float64[:], float64[:], float64[:], float64[:], int64)"
+    ],
+    cache=True
+)
+def _sweep_kernel(swing_hl, high, low, close, swings):
+    """(swing low, swing high) among the last `swings` swings swept and rejected, NaN if none."""
+    n = close.size
+    sweep_low = min(low[n - 2], low[n - 1])
+    sweep_high = max(high[n - 2], high[n - 1])
+    last_close = close[n - 1]
+    
+    # Walk back to the last `swings` rows with swing_hl != 0 (NaN counts too)
+    start = n
+    found = 0
+    while start > 0 and found < swings:
+        start -= 1
+        if swing_hl[start] != 0:
+            found += 1
+    
+    long_level = np.nan
+    short_level = np.nan
+    for i in range(start, n):
+        if swing_hl[i] == -1 and np.isnan(long_level):
+            # Price went below the low (by at least 0.1%) but closed above it
+            level = low[i]
+            if sweep_low < level and last_close > level and level - sweep_low > level * 0.001:
+                long_level = level
+        elif swing_hl[i] == 1 and np.isnan(short_level):
+            # Price went above the high (by at least 0.1%) but closed below it
+            level = high[i]
+            if sweep_high > level and last_close < level and sweep_high - level > level * 0.001:
+                short_level = level
+    return long_level, short_level
+
+
+def _zone_activity(kind: pd.Series, mitigated: pd.Series) -> np.ndarray:
+    """Zones not yet mitigated as of the last bar."""
+    kind = kind.to_numpy(dtype=np.float64)
+    mitigated = mitigated.to_numpy(dtype=np.float64)
+    return ~np.isnan(kind) & (np.isnan(mitigated) | (mitigated > kind.size - 1))
+
+
+def add_atr(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
+    """Add ATR (Wilder's smoothing) indicator to DataFrame."""
+    atr = _atr_kernel if NUMBA_AVAILABLE else _atr_numpy
+    df[f"atr_{period}"] = atr(
+        df["high"].to_numpy(dtype=np.float64),
+        df["low"].to_numpy(dtype=np.float64),
+        df["close"].to_numpy(dtype=np.float64),
+        period
+    )
     
     return df
 
 
+# Indicator columns stored as float32: direction flags and bar indices are
+# exact in float32, OB volume/strength are informational. Price levels and
+# ATR stay float64 so zone matches and stop levels are unaffected.
+_FLOAT32_COLUMNS = dict.fromkeys((
+    "swing_hl", "fvg", "fvg_mitigated", "bos", "choch", "structure_broken_idx",
+    "ob", "ob_volume", "ob_mitigated", "ob_strength", "liquidity", "liq_swept"
+), np.float32)
+
+
 def calculate_smc(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, Bars],
     swing_length: int = 10,
     fvg_join_consecutive: bool = True,
     atr_period: int = 14
@@ -59,7 +218,7 @@ def calculate_smc(
     Calculate all SMC indicators on OHLCV DataFrame.
     
     Args:
-        df: OHLCV DataFrame with lowercase columns
+        df: OHLCV DataFrame with lowercase columns, or Bars
         swing_length: Lookback for swing detection
         fvg_join_consecutive: Merge consecutive FVGs
         atr_period: Period for ATR calculation
@@ -69,144 +228,211 @@ def calculate_smc(
     """
     if df is None or len(df) < swing_length * 2 + 10:
         logger.warning("Insufficient data for SMC calculation")
-        return df
+        return df.to_frame() if isinstance(df, Bars) else df
     
-    # Ensure lowercase columns (SMC requirement)
-    df = df.copy()
-    df.columns = [c.lower() for c in df.columns]
+    # smartmoneyconcepts works on DataFrames - build one only past the guard
+    if isinstance(df, Bars):
+        df = df.to_frame()
+    elif isinstance(df.index, pd.DatetimeIndex):
+        # smartmoneyconcepts returns RangeIndex results - bring a DatetimeIndex
+        # (get_klines) back to a timestamp column so assignments line up
+        df = df.reset_index()
+    else:
+        # Indicator columns go on a shallow copy, leaving the caller's frame
+        # untouched without duplicating the OHLCV data
+        df = df.copy(deep=False)
+    
+    # Ensure lowercase columns (SMC requirement) - callers normally pass them already
+    if any(c != c.lower() for c in df.columns):
+        df.columns = [c.lower() for c in df.columns]
     
     # Add ATR
     df = add_atr(df, atr_period)
     
+    smc = _get_smc()
+    
     # 1. Swing Highs and Lows
     swing_hl = smc.swing_highs_lows(df, swing_length=swing_length)
-    df["swing_hl"] = swing_hl["HighLow"]
-    df["swing_level"] = swing_hl["Level"]
     
     # 2. Fair Value Gaps
     fvg = smc.fvg(df, join_consecutive=fvg_join_consecutive)
-    df["fvg"] = fvg["FVG"]  # 1=bullish, -1=bearish
-    df["fvg_top"] = fvg["Top"]
-    df["fvg_bottom"] = fvg["Bottom"]
-    df["fvg_mitigated"] = fvg["MitigatedIndex"]
     
     # 3. Break of Structure & Change of Character
     bos_choch = smc.bos_choch(df, swing_hl, close_break=True)
-    df["bos"] = bos_choch["BOS"]  # 1=bullish, -1=bearish
-    df["choch"] = bos_choch["CHOCH"]  # 1=bullish, -1=bearish
-    df["structure_level"] = bos_choch["Level"]
-    df["structure_broken_idx"] = bos_choch["BrokenIndex"]
     
     # 4. Order Blocks
     ob = smc.ob(df, swing_hl, close_mitigation=False)
-    df["ob"] = ob["OB"]  # 1=bullish, -1=bearish
-    df["ob_top"] = ob["Top"]
-    df["ob_bottom"] = ob["Bottom"]
-    df["ob_volume"] = ob["OBVolume"]
-    df["ob_mitigated"] = ob["MitigatedIndex"]
-    df["ob_strength"] = ob["Percentage"]
     
     # 5. Liquidity
     liq = smc.liquidity(df, swing_hl, range_percent=0.01)
-    df["liquidity"] = liq["Liquidity"]  # 1=bullish, -1=bearish
-    df["liq_level"] = liq["Level"]
-    df["liq_swept"] = liq["Swept"]
+    
+    # Attach all indicator columns in one concat instead of one insert each
+    indicators = pd.DataFrame({
+        "swing_hl": swing_hl["HighLow"],
+        "swing_level": swing_hl["Level"],
+        "fvg": fvg["FVG"],  # 1=bullish, -1=bearish
+        "fvg_top": fvg["Top"],
+        "fvg_bottom": fvg["Bottom"],
+        "fvg_mitigated": fvg["MitigatedIndex"],
+        "fvg_active": _zone_activity(fvg["FVG"], fvg["MitigatedIndex"]),
+        "bos": bos_choch["BOS"],  # 1=bullish, -1=bearish
+        "choch": bos_choch["CHOCH"],  # 1=bullish, -1=bearish
+        "structure_level": bos_choch["Level"],
+        "structure_broken_idx": bos_choch["BrokenIndex"],
+        "ob": ob["OB"],  # 1=bullish, -1=bearish
+        "ob_top": ob["Top"],
+        "ob_bottom": ob["Bottom"],
+        "ob_volume": ob["OBVolume"],
+        "ob_mitigated": ob["MitigatedIndex"],
+        "ob_strength": ob["Percentage"],
+        "ob_active": _zone_activity(ob["OB"], ob["MitigatedIndex"]),
+        "liquidity": liq["Liquidity"],  # 1=bullish, -1=bearish
+        "liq_level": liq["Level"],
+        "liq_swept": liq["Swept"]
+    }, index=df.index).astype(_FLOAT32_COLUMNS)
+    df = pd.concat([df, indicators], axis=1, copy=False)
     
     return df
 
 
-def get_active_order_blocks(df: pd.DataFrame, lookback: int = 50) -> dict:
+def _tail(df: pd.DataFrame, column: str, lookback: int, dtype=np.float64) -> np.ndarray:
+    """Last `lookback` values of a column - a view unless a dtype cast is needed."""
+    return np.asarray(df[column].to_numpy()[-lookback:], dtype=dtype)
+
+
+def get_active_order_blocks(df: pd.DataFrame, lookback: int = 50) -> ZoneSet:
     """
     Find unmitigated (active) order blocks in recent history.
     
     Returns:
-        {
-            "bullish": [(index, top, bottom, strength), ...],
-            "bearish": [(index, top, bottom, strength), ...]
-        }
+        {"bullish": Zones, "bearish": Zones} with strength set
     """
     if df is None or "ob" not in df.columns:
-        return {"bullish": [], "bearish": []}
+        return {"bullish": _NO_OBS, "bearish": _NO_OBS}
     
-    recent = df.iloc[-lookback:]
-    current_idx = len(df) - 1
+    index = df.index[-lookback:]
+    ob, top, bottom, strength = (
+        _tail(df, c, lookback) for c in ("ob", "ob_top", "ob_bottom", "ob_strength")
+    )
     
-    bullish_obs = []
-    bearish_obs = []
+    # Skip OBs that are already mitigated (precomputed by calculate_smc)
+    active = _tail(df, "ob_active", lookback, np.bool_)
     
-    for i in range(len(recent)):
-        idx = recent.index[i]
-        ob_type = recent.iloc[i]["ob"]
-        
-        if pd.isna(ob_type):
-            continue
-        
-        # Check if OB is mitigated
-        mitigated_idx = recent.iloc[i]["ob_mitigated"]
-        if not pd.isna(mitigated_idx) and mitigated_idx <= current_idx:
-            continue  # Already mitigated
-        
-        ob_data = (
-            idx,
-            recent.iloc[i]["ob_top"],
-            recent.iloc[i]["ob_bottom"],
-            recent.iloc[i]["ob_strength"]
-        )
-        
-        if ob_type == 1:
-            bullish_obs.append(ob_data)
-        elif ob_type == -1:
-            bearish_obs.append(ob_data)
+    def collect(mask: np.ndarray) -> Zones:
+        return Zones(index[mask].to_numpy(), top[mask], bottom[mask], strength[mask])
     
-    return {"bullish": bullish_obs, "bearish": bearish_obs}
+    return {"bullish": collect(active & (ob == 1)), "bearish": collect(active & (ob == -1))}
 
 
-def get_active_fvgs(df: pd.DataFrame, lookback: int = 30) -> dict:
+def get_active_fvgs(df: pd.DataFrame, lookback: int = 30) -> ZoneSet:
     """
     Find unmitigated (active) Fair Value Gaps.
     
     Returns:
-        {
-            "bullish": [(index, top, bottom), ...],
-            "bearish": [(index, top, bottom), ...]
-        }
+        {"bullish": Zones, "bearish": Zones}
     """
     if df is None or "fvg" not in df.columns:
-        return {"bullish": [], "bearish": []}
+        return {"bullish": _NO_FVGS, "bearish": _NO_FVGS}
     
-    recent = df.iloc[-lookback:]
-    current_idx = len(df) - 1
+    index = df.index[-lookback:]
+    fvg, top, bottom = (_tail(df, c, lookback) for c in ("fvg", "fvg_top", "fvg_bottom"))
     
-    bullish_fvgs = []
-    bearish_fvgs = []
+    # Skip FVGs that are already mitigated (precomputed by calculate_smc)
+    active = _tail(df, "fvg_active", lookback, np.bool_)
     
-    for i in range(len(recent)):
-        idx = recent.index[i]
-        fvg_type = recent.iloc[i]["fvg"]
-        
-        if pd.isna(fvg_type):
-            continue
-        
-        # Check if FVG is mitigated
-        mitigated_idx = recent.iloc[i]["fvg_mitigated"]
-        if not pd.isna(mitigated_idx) and mitigated_idx <= current_idx:
-            continue  # Already mitigated
-        
-        fvg_data = (
-            idx,
-            recent.iloc[i]["fvg_top"],
-            recent.iloc[i]["fvg_bottom"]
-        )
-        
-        if fvg_type == 1:
-            bullish_fvgs.append(fvg_data)
-        elif fvg_type == -1:
-            bearish_fvgs.append(fvg_data)
+    def collect(mask: np.ndarray) -> Zones:
+        return Zones(index[mask].to_numpy(), top[mask], bottom[mask])
     
-    return {"bullish": bullish_fvgs, "bearish": bearish_fvgs}
+    return {"bullish": collect(active & (fvg == 1)), "bearish": collect(active & (fvg == -1))}
+
+
+def _no_zones(with_strength: bool = False) -> Zones:
+    """Read-only empty Zones, shared by every call on a frame without indicator columns."""
+    empty = np.empty(0)
+    empty_idx = np.empty(0, dtype=np.int64)
+    empty.flags.writeable = empty_idx.flags.writeable = False
+    return Zones(empty_idx, empty, empty, empty if with_strength else None)
+
 
+_NO_OBS = _no_zones(with_strength=True)
+_NO_FVGS = _no_zones()
 
-def get_latest_structure(df: pd.DataFrame, lookback: int = 20) -> dict:
+
+# Zone columns per kind: (type, top, bottom, active)
+_ZONE_COLUMNS = {
+    "ob": ("ob", "ob_top", "ob_bottom", "ob_active"),
+    "fvg": ("fvg", "fvg_top", "fvg_bottom", "fvg_active"),
+}
+
+
+def find_active_zones(
+    df: pd.DataFrame,
+    kind: str,
+    price: float,
+    lookback: int,
+    bullish_mults: Tuple[float, float] = (1.0, 1.0),
+    bearish_mults: Tuple[float, float] = (1.0, 1.0)
+) -> ZoneHits:
+    """
+    First active bullish and bearish zone in the lookback whose range contains price.
+    
+    Same zones and order as get_active_order_blocks/get_active_fvgs, but
+    scanned straight off the columns without building the lists. The
+    columns are extracted once and shared by both directions.
+    
+    Args:
+        kind: "ob" or "fvg"
+        bullish_mults/bearish_mults: (bottom, top) edge scales, e.g. (1.0, 1.001)
+            for a 0.1% buffer above the zone
+    
+    Returns:
+        {"bullish": (index, top, bottom) or None, "bearish": (index, top, bottom) or None}
+    """
+    columns = _ZONE_COLUMNS[kind]
+    if df is None or columns[0] not in df.columns:
+        return {"bullish": None, "bearish": None}
+    
+    kind_arr, top, bottom = (_tail(df, c, lookback) for c in columns[:3])
+    active = _tail(df, columns[3], lookback, np.bool_)
+    price = float(price)
+    
+    def first_hit(direction: float, mults: Tuple[float, float]):
+        i = _zone_hit_kernel(kind_arr, top, bottom, active, direction, price, *mults)
+        return None if i < 0 else (df.index[i - top.size], float(top[i]), float(bottom[i]))
+    
+    return {"bullish": first_hit(1.0, bullish_mults), "bearish": first_hit(-1.0, bearish_mults)}
+
+
+def find_liquidity_sweeps(df: pd.DataFrame, swings: int = 2) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Swing levels swept by the last two candles with a close back inside.
+    
+    Only the last `swings` swing points are considered. A level counts when
+    the sweep went at least 0.1% beyond it.
+    
+    Returns:
+        (swept swing low or None, swept swing high or None)
+    """
+    if df is None or "swing_hl" not in df.columns or len(df) < 2:
+        return None, None
+    
+    swing_hl = df["swing_hl"].to_numpy()
+    if swing_hl.dtype != np.float32:
+        swing_hl = np.asarray(swing_hl, dtype=np.float64)
+    long_level, short_level = _sweep_kernel(
+        swing_hl,
+        np.asarray(df["high"].to_numpy(), dtype=np.float64),
+        np.asarray(df["low"].to_numpy(), dtype=np.float64),
+        np.asarray(df["close"].to_numpy(), dtype=np.float64),
+        swings
+    )
+    return (
+        None if math.isnan(long_level) else long_level,
+        None if math.isnan(short_level) else short_level
+    )
+
+
+def get_latest_structure(df: pd.DataFrame, lookback: int = 20) -> Structure:
     """
     Get the most recent BOS or CHoCH signal.
     
@@ -221,29 +447,22 @@ def get_latest_structure(df: pd.DataFrame, lookback: int = 20) -> dict:
     if df is None or "bos" not in df.columns:
         return {"type": None, "direction": None, "level": None, "index": None}
     
-    recent = df.iloc[-lookback:]
+    choch = df["choch"].to_numpy()[-lookback:]
+    bos = df["bos"].to_numpy()[-lookback:]
     
-    # Find most recent non-NaN BOS or CHOCH
-    for i in range(len(recent) - 1, -1, -1):
-        row = recent.iloc[i]
-        
-        if not pd.isna(row["choch"]):
-            return {
-                "type": "CHOCH",
-                "direction": int(row["choch"]),
-                "level": row["structure_level"],
-                "index": recent.index[i]
-            }
-        
-        if not pd.isna(row["bos"]):
-            return {
-                "type": "BOS",
-                "direction": int(row["bos"]),
-                "level": row["structure_level"],
-                "index": recent.index[i]
-            }
+    # Most recent bar with a BOS or CHOCH (CHOCH wins on the same bar)
+    hits = np.flatnonzero(~np.isnan(choch) | ~np.isnan(bos))
+    if not hits.size:
+        return {"type": None, "direction": None, "level": None, "index": None}
     
-    return {"type": None, "direction": None, "level": None, "index": None}
+    i = hits[-1]
+    is_choch = not math.isnan(choch[i])
+    return {
+        "type": "CHOCH" if is_choch else "BOS",
+        "direction": int(choch[i] if is_choch else bos[i]),
+        "level": df["structure_level"].iat[i - bos.size],
+        "index": df.index[i - bos.size]
+    }
 
 
 if __name__ == "__main__":
@@ -251,7 +470,7 @@ if __name__ == "__main__":
     from market_data import BybitDataFetcher
     
     fetcher = BybitDataFetcher()
-    df = fetcher.get_klines("BTCUSDT", "15", 200)
+    df = fetcher.get_klines("BTCUSDT", "15", 200, dtype="float64")
     
     if df is not None:
         print("📊 Calculating SMC indicators...")
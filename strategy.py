@@ -7,17 +7,41 @@ Strategies:
 """
 
 import logging
+import math
 import pandas as pd
 from datetime import datetime
 import pytz
-from typing import Dict, Tuple, Optional, List
-from smc_indicators import calculate_smc, get_active_order_blocks, get_active_fvgs, get_latest_structure
+from typing import Tuple, Optional, NamedTuple
+from smc_indicators import find_active_zones, find_liquidity_sweeps, get_latest_structure
 
 logger = logging.getLogger(__name__)
 
+# Exit defaults: TP at 2x the risk, 1% of price when ATR is unavailable
+TP_RISK_MULTIPLE = 2.0
+ATR_FALLBACK_PCT = 0.01
+
+
+class OrderBlockConfig(NamedTuple):
+    """strategy.order_block settings read by the strategy."""
+    lookback: int = 50
+    require_structure: bool = True
+
+
+class LiquiditySweepConfig(NamedTuple):
+    """strategy.liquidity_sweep settings read by the strategy."""
+    require_volume: bool = True
+
+
+def _freeze(settings: type, cfg: dict):
+    """Parse a strategy's config section once into its NamedTuple; unknown keys are ignored."""
+    return settings(**{k: v for k, v in cfg.items() if k in settings._fields})
+
 class BaseStrategy:
     """Base class for all strategies."""
     
+    # Slotted (no per-instance __dict__) - subclasses list their own attributes
+    __slots__ = ("config",)
+    
     def __init__(self, config: dict):
         self.config = config
         
@@ -33,59 +57,54 @@ class OrderBlockStrategy(BaseStrategy):
     3. Confirm with Break of Structure (BOS) or Change of Character (CHoCH)
     """
     
+    __slots__ = ("_cfg",)
+    
     def __init__(self, config: dict):
         super().__init__(config)
-        self.cfg = config.get("order_block", {})
+        self._cfg = _freeze(OrderBlockConfig, config.get("order_block", {}))
         
     def get_signal(self, df: pd.DataFrame, symbol: str) -> Tuple[Optional[str], Optional[dict]]:
         if df is None or len(df) < 50:
             return None, None
             
-        current_price = df.iloc[-1]["close"]
+        current_price = df["close"].to_numpy()[-1]
         
-        # Get active OBs
-        obs = get_active_order_blocks(df, lookback=self.cfg.get("lookback", 50))
+        # Price inside or just above an active bullish OB / just below a bearish one
+        obs = find_active_zones(
+            df, "ob", current_price, self._cfg.lookback,
+            bullish_mults=(1.0, 1.001), bearish_mults=(0.999, 1.0)
+        )
+        long_ob, short_ob = obs["bullish"], obs["bearish"]
+        if long_ob is None and short_ob is None:
+            return None, None
         
-        # Check Long (Bullish OB)
-        for ob in obs["bullish"]:
-            # OB format: (index, top, bottom, strength)
-            ob_top = ob[1]
-            ob_bottom = ob[2]
-            
-            # Check if price is inside or near OB
-            if ob_bottom <= current_price <= ob_top * 1.001:
-                # Check confirmation if required
-                if self.cfg.get("require_structure", True):
-                    structure = get_latest_structure(df, lookback=20)
-                    # Need bullish structure (CHOCH or BOS = 1)
-                    if structure["direction"] != 1:
-                        continue
-                        
-                return "LONG", {
-                    "strategy": "OrderBlock",
-                    "entry_price": current_price,
-                    "stop_loss": ob_bottom,  # SL below OB
-                    "ob_level": ob_top
-                }
+        # Structure confirmation, computed once for both directions
+        # (CHOCH or BOS: 1 confirms longs, -1 confirms shorts)
+        if self._cfg.require_structure:
+            direction = get_latest_structure(df, lookback=20)["direction"]
+            long_ok, short_ok = direction == 1, direction == -1
+        else:
+            long_ok = short_ok = True
+        
+        # Check Long
+        if long_ob is not None and long_ok:
+            _, ob_top, ob_bottom = long_ob
+            return "LONG", {
+                "strategy": "OrderBlock",
+                "entry_price": current_price,
+                "stop_loss": ob_bottom,  # SL below OB
+                "ob_level": ob_top
+            }
 
-        # Check Short (Bearish OB)
-        for ob in obs["bearish"]:
-            ob_top = ob[1]
-            ob_bottom = ob[2]
-            
-            if ob_bottom * 0.999 <= current_price <= ob_top:
-                if self.cfg.get("require_structure", True):
-                    structure = get_latest_structure(df, lookback=20)
-                    # Need bearish structure (CHOCH or BOS = -1)
-                    if structure["direction"] != -1:
-                        continue
-                        
-                return "SHORT", {
-                    "strategy": "OrderBlock",
-                    "entry_price": current_price,
-                    "stop_loss": ob_top,  # SL above OB
-                    "ob_level": ob_bottom
-                }
+        # Check Short
+        if short_ob is not None and short_ok:
+            _, ob_top, ob_bottom = short_ob
+            return "SHORT", {
+                "strategy": "OrderBlock",
+                "entry_price": current_price,
+                "stop_loss": ob_top,  # SL above OB
+                "ob_level": ob_bottom
+            }
                 
         return None, None
 
@@ -97,74 +116,48 @@ class LiquiditySweepStrategy(BaseStrategy):
     3. Wait for close BACK inside the range (Rejection)
     """
     
+    __slots__ = ("_cfg",)
+    
     def __init__(self, config: dict):
         super().__init__(config)
-        self.cfg = config.get("liquidity_sweep", {})
+        self._cfg = _freeze(LiquiditySweepConfig, config.get("liquidity_sweep", {}))
         
     def get_signal(self, df: pd.DataFrame, symbol: str) -> Tuple[Optional[str], Optional[dict]]:
         if df is None or len(df) < 50:
             return None, None
             
-        # Get recent swing points - only check last 2 (reduced from 5)
-        recent_swings = df[df["swing_hl"] != 0].tail(2)
-        
-        # Current candle
-        curr = df.iloc[-1]
-        prev = df.iloc[-2]
+        high = df["high"].to_numpy()
+        low = df["low"].to_numpy()
+        close = df["close"].to_numpy()[-1]
+        volume = df["volume"].to_numpy()
         
         # Volume filter - require above average volume on sweep candle
-        avg_volume = df["volume"].tail(20).mean()
-        require_volume = self.cfg.get("require_volume", True)
+        if self._cfg.require_volume and not volume[-1] > volume[-20:].mean() * 1.2:
+            return None, None
         
-        # Check Long (Sweep of Swing Low)
-        for idx, swing in recent_swings.iterrows():
-            if swing["swing_hl"] == -1: # Swing Low
-                level = swing["low"]
-                
-                # Logic: Price went below level but closed above it
-                swept = df["low"].iloc[-2] < level or df["low"].iloc[-1] < level
-                rejected = df["close"].iloc[-1] > level
-                
-                # Additional filters
-                has_volume = curr["volume"] > avg_volume * 1.2 if require_volume else True
-                
-                # Minimum sweep distance (0.1% beyond level)
-                min_sweep = level * 0.001
-                actual_sweep = level - min(df["low"].iloc[-2], df["low"].iloc[-1])
-                meaningful_sweep = actual_sweep > min_sweep
-                
-                if swept and rejected and has_volume and meaningful_sweep:
-                    return "LONG", {
-                        "strategy": "LiquiditySweep",
-                        "entry_price": curr["close"],
-                        "stop_loss": min(curr["low"], prev["low"]), # Tight stop below sweep
-                        "sweep_level": level
-                    }
-                    
-        # Check Short (Sweep of Swing High)
-        for idx, swing in recent_swings.iterrows():
-            if swing["swing_hl"] == 1: # Swing High
-                level = swing["high"]
-                
-                # Logic: Price went above level but closed below it
-                swept = df["high"].iloc[-2] > level or df["high"].iloc[-1] > level
-                rejected = df["close"].iloc[-1] < level
-                
-                # Additional filters
-                has_volume = curr["volume"] > avg_volume * 1.2 if require_volume else True
-                
-                # Minimum sweep distance
-                min_sweep = level * 0.001
-                actual_sweep = max(df["high"].iloc[-2], df["high"].iloc[-1]) - level
-                meaningful_sweep = actual_sweep > min_sweep
-                
-                if swept and rejected and has_volume and meaningful_sweep:
-                    return "SHORT", {
-                        "strategy": "LiquiditySweep",
-                        "entry_price": curr["close"],
-                        "stop_loss": max(curr["high"], prev["high"]), # Tight stop above sweep
-                        "sweep_level": level
-                    }
+        # Sweep of the last 2 swing points (reduced from 5); a long sweep
+        # takes priority over a short one
+        long_level, short_level = find_liquidity_sweeps(df, swings=2)
+        
+        # Tight stops beyond the sweep extremes of the last two candles
+        sweep_low = min(low[-2], low[-1])
+        sweep_high = max(high[-2], high[-1])
+        
+        if long_level is not None:
+            return "LONG", {
+                "strategy": "LiquiditySweep",
+                "entry_price": close,
+                "stop_loss": sweep_low, # Tight stop below sweep
+                "sweep_level": long_level
+            }
+        
+        if short_level is not None:
+            return "SHORT", {
+                "strategy": "LiquiditySweep",
+                "entry_price": close,
+                "stop_loss": sweep_high, # Tight stop above sweep
+                "sweep_level": short_level
+            }
                     
         return None, None
 
@@ -175,72 +168,81 @@ class SilverBulletStrategy(BaseStrategy):
     Entries based on FVG formation.
     """
     
+    __slots__ = ("_ny_tz", "_windows", "_window_cache")
+    
     def __init__(self, config: dict):
         super().__init__(config)
-        self.cfg = config.get("silver_bullet", {})
+        cfg = config.get("silver_bullet", {})
         
-    def _is_in_window(self) -> bool:
-        # Get current time in NY
         try:
-            ny_tz = pytz.timezone('America/New_York')
-            now = datetime.now(ny_tz)
+            self._ny_tz = pytz.timezone('America/New_York')
         except Exception:
             # Fallback if tz database not found
-            now = datetime.now()
-            
-        # Windows breakdown (hour, start_min, end_min)
-        windows = []
-        sessions = self.cfg.get("sessions", [])
+            self._ny_tz = None
         
-        if "london_open" in sessions:
-            windows.append((3, 0, 4, 0)) # 3 AM - 4 AM
-        if "ny_am" in sessions:
-            windows.append((10, 0, 11, 0)) # 10 AM - 11 AM
-        if "ny_pm" in sessions:
-            windows.append((14, 0, 15, 0)) # 2 PM - 3 PM
-            
-        for h_start, m_start, h_end, m_end in windows:
-            start_dt = now.replace(hour=h_start, minute=m_start, second=0, microsecond=0)
-            end_dt = now.replace(hour=h_end, minute=m_end, second=0, microsecond=0)
-            if start_dt <= now <= end_dt:
-                return True
-                
-        return False
+        # Windows as ((h_start, m_start), (h_end, m_end)) NY times
+        sessions = cfg.get("sessions", [])
+        self._windows = tuple(
+            window for session, window in (
+                ("london_open", ((3, 0), (4, 0))), # 3 AM - 4 AM
+                ("ny_am", ((10, 0), (11, 0))), # 10 AM - 11 AM
+                ("ny_pm", ((14, 0), (15, 0))) # 2 PM - 3 PM
+            ) if session in sessions
+        )
+        
+        # (minute, in_window) of the last check - the answer only changes per minute
+        self._window_cache = (None, False)
+        
+    def _is_in_window(self) -> bool:
+        # Get current time in NY
+        now = datetime.now(self._ny_tz)
+        minute = (now.year, now.month, now.day, now.hour, now.minute)
+        
+        cached_minute, in_window = self._window_cache
+        if minute == cached_minute:
+            return in_window
+        
+        hm = (now.hour, now.minute)
+        in_window = any(start <= hm < end for start, end in self._windows)
+        self._window_cache = (minute, in_window)
+        return in_window
         
     def get_signal(self, df: pd.DataFrame, symbol: str) -> Tuple[Optional[str], Optional[dict]]:
         if not self._is_in_window():
             return None, None
             
         # Simplified logic: Trade strictly on FVG confluence
-        active_fvgs = get_active_fvgs(df, lookback=10)
-        current_price = df.iloc[-1]["close"]
+        current_price = df["close"].to_numpy()[-1]
+        
+        fvgs = find_active_zones(df, "fvg", current_price, lookback=10)
         
-        # Long at Bullish FVG
-        for fvg in active_fvgs["bullish"]:
-            # FVG: (index, top, bottom)
-            if fvg[2] <= current_price <= fvg[1]: # Inside FVG
-                 return "LONG", {
-                    "strategy": "SilverBullet",
-                    "entry_price": current_price,
-                    "stop_loss": fvg[2] * 0.999, # Below FVG
-                    "fvg_level": fvg[1]
-                }
+        # Long at Bullish FVG - (index, top, bottom)
+        fvg = fvgs["bullish"]
+        if fvg is not None: # Inside FVG
+            return "LONG", {
+                "strategy": "SilverBullet",
+                "entry_price": current_price,
+                "stop_loss": fvg[2] * 0.999, # Below FVG
+                "fvg_level": fvg[1]
+            }
                 
         # Short at Bearish FVG
-        for fvg in active_fvgs["bearish"]:
-            if fvg[2] <= current_price <= fvg[1]: # Inside FVG
-                 return "SHORT", {
-                    "strategy": "SilverBullet",
-                    "entry_price": current_price,
-                    "stop_loss": fvg[1] * 1.001, # Above FVG
-                    "fvg_level": fvg[2]
-                }
+        fvg = fvgs["bearish"]
+        if fvg is not None: # Inside FVG
+            return "SHORT", {
+                "strategy": "SilverBullet",
+                "entry_price": current_price,
+                "stop_loss": fvg[1] * 1.001, # Above FVG
+                "fvg_level": fvg[2]
+            }
 
         return None, None
 
 class StrategyManager:
     """Manages multiple strategies."""
     
+    __slots__ = ("strategies", "config", "_atr_column")
+    
     def __init__(self, config: dict):
         self.strategies = []
         self.config = config
@@ -255,6 +257,10 @@ class StrategyManager:
         
         logger.info(f"🧠 Initializing Strategies: {active}")
         
+        # ATR column calculate_smc writes for the configured period
+        atr_period = config.get("strategy", {}).get("common", {}).get("atr_period", 14)
+        self._atr_column = f"atr_{atr_period}"
+        
         if "order_block" in active:
             self.strategies.append(OrderBlockStrategy(strategy_config))
         if "liquidity_sweep" in active:
@@ -281,15 +287,11 @@ class StrategyManager:
         Calculate SL and TP levels.
         delegates to common logic or strategy specific if needed.
         """
-        # Common ATR fallback
-        atr_period = 14
-        try:
-             atr = df.iloc[-1][f"atr_{atr_period}"]
-        except Exception:
-             atr = entry_price * 0.01
-
-        if pd.isna(atr):
-            atr = entry_price * 0.01
+        # ATR of the last bar; 1% of price when the column is missing or NaN
+        has_atr = df is not None and len(df) and self._atr_column in df.columns
+        atr = df[self._atr_column].to_numpy()[-1] if has_atr else math.nan
+        if atr != atr:
+            atr = entry_price * ATR_FALLBACK_PCT
             
         sl_price = 0.0
         tp_price = 0.0
@@ -298,23 +300,18 @@ class StrategyManager:
         # If strategy provided a hard stop level (e.g. OB limit or Sweep low), use it
         stop_basis = details.get("stop_loss", entry_price)
         
-        # Default multipliers
-        tp_mult = 2.0
-        
         if side == "LONG":
             sl_price = stop_basis
             if sl_price >= entry_price: # Safety
-                 sl_price = entry_price - (atr * 1.0)
+                 sl_price = entry_price - atr
             
-            risk = entry_price - sl_price
-            tp_price = entry_price + (risk * tp_mult)
+            tp_price = entry_price + (entry_price - sl_price) * TP_RISK_MULTIPLE
                 
         elif side == "SHORT":
             sl_price = stop_basis
             if sl_price <= entry_price:
-                 sl_price = entry_price + (atr * 1.0)
+                 sl_price = entry_price + atr
                  
-            risk = sl_price - entry_price
-            tp_price = entry_price - (risk * tp_mult)
+            tp_price = entry_price - (sl_price - entry_price) * TP_RISK_MULTIPLE
                 
         return sl_price, tp_price
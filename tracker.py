@@ -1,56 +1,239 @@
 """
 Trade Tracker - Track win rates and ROI.
 
-Persists trade history to JSON file for analysis.
+Persists trade history to JSON file for analysis. New trades are appended
+to a JSON-lines journal and periodically compacted into a snapshot - a
+msgpack file when msgpack is installed (much faster to load on large
+histories), otherwise the JSON file itself.
 """
 
+import atexit
 import json
 import logging
+import os
 from datetime import datetime
+from itertools import islice
 from typing import Optional, Dict, List
 from pathlib import Path
 
+# orjson is optional - stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# msgpack is optional - snapshots stay JSON without it
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _dumps(obj) -> bytes:
+    """Serialize compactly (no indentation), NumPy scalars included."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), default=float).encode()
+
+
+def _dumps_line(record: Dict) -> bytes:
+    """Serialize a record as one JSON line."""
+    return _dumps(record) + b"\n"
+
+
+def _loads(raw: bytes):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def _pack_default(obj):
+    """Convert NumPy scalars msgpack can't serialize natively."""
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
 class TradeTracker:
     """Track trading performance with persistence."""
     
+    COMPACT_EVERY = 50  # Journaled trades before the snapshot is rewritten
+    
     def __init__(self, filepath: str = "trades.json"):
-        """Initialize tracker with file path for persistence."""
+        """
+        Initialize tracker with file path for persistence.
+        
+        Completed trades are journaled to <filepath>.jsonl and order logs to
+        orders.jsonl in the same directory. The journal is compacted into the
+        snapshot (<filepath>.msgpack when msgpack is installed) and the JSON
+        file is refreshed at interpreter exit.
+        """
         self.filepath = Path(filepath)
+        self.snapshot_path = self.filepath.with_suffix(".msgpack") if msgpack else self.filepath
+        self.journal_path = self.filepath.with_suffix(".jsonl")
+        self.orders_path = self.filepath.with_name("orders.jsonl")
         self.trades: List[Dict] = []
+        self._reset_stats()
+        self._journaled = 0  # Trades in the journal but not the snapshot
+        self._export_stale = False  # JSON file behind the msgpack snapshot
+        self._journal = None
+        self._orders = None
         self.load()
+        atexit.register(self.close)
+    
+    def _reset_stats(self):
+        """Zero the running aggregates behind get_stats."""
+        self._wins = 0
+        self._sum_pnl_pct = 0.0
+        self._sum_pnl_usd = 0.0
+        self._sum_win_pct = 0.0
+        self._sum_loss_pct = 0.0
+        self._best: Optional[Dict] = None
+        self._worst: Optional[Dict] = None
+    
+    def _accumulate(self, trade: Dict):
+        """Fold one trade into the running aggregates."""
+        pnl_pct = trade["pnl_pct"]
+        self._sum_pnl_pct += pnl_pct
+        self._sum_pnl_usd += trade["pnl_usd"]
+        if trade["is_win"]:
+            self._wins += 1
+            self._sum_win_pct += pnl_pct
+        else:
+            self._sum_loss_pct += pnl_pct
+        
+        # Strict comparisons keep the earliest trade on ties, like max()/min()
+        if self._best is None or pnl_pct > self._best["pnl_pct"]:
+            self._best = trade
+        if self._worst is None or pnl_pct < self._worst["pnl_pct"]:
+            self._worst = trade
     
     def load(self):
-        """Load trade history from file."""
-        if self.filepath.exists():
+        """Load the trade snapshot, then replay trades journaled after it."""
+        self.trades = []
+        source = self._snapshot_source()
+        if source:
             try:
-                with open(self.filepath, "r") as f:
-                    data = json.load(f)
-                    self.trades = data.get("trades", [])
-                logger.info(f"📂 Loaded {len(self.trades)} trades from {self.filepath}")
+                if source.suffix == ".msgpack":
+                    data = msgpack.unpackb(source.read_bytes())
+                else:
+                    data = _loads(source.read_bytes())
+                self.trades = data.get("trades", [])
             except Exception as e:
                 logger.error(f"Failed to load trades: {e}")
                 self.trades = []
+        
+        self._journaled = 0
+        if self.journal_path.exists():
+            # Skip records a compaction already folded into the snapshot
+            last_id = self.trades[-1]["id"] if self.trades else 0
+            try:
+                with open(self.journal_path, "rb") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            trade = _loads(line)
+                        except ValueError:
+                            logger.warning(f"Skipping corrupt line in {self.journal_path}")
+                            continue
+                        if trade.get("id", 0) > last_id:
+                            self.trades.append(trade)
+                            self._journaled += 1
+                            last_id = trade["id"]
+            except Exception as e:
+                logger.error(f"Failed to replay trade journal: {e}")
+        
+        self._reset_stats()
+        for trade in self.trades:
+            self._accumulate(trade)
+        
+        if self.trades:
+            logger.info(f"📂 Loaded {len(self.trades)} trades from {source}")
+    
+    def _snapshot_source(self) -> Optional[Path]:
+        """Newest existing snapshot, so a JSON-only history still migrates."""
+        candidates = [p for p in {self.snapshot_path, self.filepath} if p.exists()]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda p: (p.stat().st_mtime, p == self.snapshot_path))
+    
+    def _write_snapshot(self, path: Path, data: Dict):
+        """Atomically write data to path, as msgpack or JSON by suffix."""
+        if path.suffix == ".msgpack":
+            raw = msgpack.packb(data, default=_pack_default)
         else:
-            self.trades = []
+            raw = _dumps(data)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(raw)
+        os.replace(tmp_path, path)
     
-    def save(self):
-        """Save trade history to file."""
+    def save(self, export_json: bool = False):
+        """
+        Compact: write the full snapshot, then truncate the journal.
+        
+        Args:
+            export_json: Also refresh the JSON file when the snapshot is msgpack
+        """
         try:
             data = {
                 "updated_at": datetime.now().isoformat(),
                 "stats": self.get_stats(),
                 "trades": self.trades
             }
-            with open(self.filepath, "w") as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"💾 Saved {len(self.trades)} trades to {self.filepath}")
+            # Export first so the binary snapshot stays the newest on disk
+            if export_json and self.snapshot_path != self.filepath:
+                self._write_snapshot(self.filepath, data)
+            self._write_snapshot(self.snapshot_path, data)
+            self._export_stale = not export_json and self.snapshot_path != self.filepath
+            
+            if self._journal:
+                self._journal.truncate(0)
+            elif self.journal_path.exists():
+                self.journal_path.write_bytes(b"")
+            self._journaled = 0
+            logger.info(f"💾 Saved {len(self.trades)} trades to {self.snapshot_path}")
         except Exception as e:
             logger.error(f"Failed to save trades: {e}")
     
+    def _append(self, trade: Dict):
+        """Journal one trade, compacting every COMPACT_EVERY trades."""
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_path, "ab")
+            self._journal.write(_dumps_line(trade))
+            self._journal.flush()
+            self._journaled += 1
+        except Exception as e:
+            logger.error(f"Failed to journal trade: {e}")
+        
+        if self._journaled >= self.COMPACT_EVERY:
+            self.save()
+    
+    def log_trade(self, record: Dict):
+        """
+        Append an order event (placement, dry-run signal) to orders.jsonl.
+        
+        Orders are not completed trades and don't affect stats.
+        """
+        try:
+            if self._orders is None:
+                self._orders = open(self.orders_path, "ab")
+            self._orders.write(_dumps_line({"timestamp": datetime.now().isoformat(), **record}))
+            self._orders.flush()
+        except Exception as e:
+            logger.error(f"Failed to log order: {e}")
+    
+    def close(self):
+        """Compact the journal, refresh the JSON export and close open files."""
+        if self._journaled or self._export_stale:
+            self.save(export_json=True)
+        for fp in (self._journal, self._orders):
+            if fp:
+                fp.close()
+        self._journal = self._orders = None
+    
     def record_trade(
         self,
         symbol: str,
@@ -108,7 +291,8 @@ class TradeTracker:
         }
         
         self.trades.append(trade)
-        self.save()
+        self._accumulate(trade)
+        self._append(trade)
         
         logger.info(f"{'✅' if is_win else '❌'} Trade recorded: {symbol} {side} - {pnl_pct:+.2f}% (${pnl_usd:+.4f})")
         
@@ -146,25 +330,24 @@ class TradeTracker:
                 "worst_trade": None
             }
         
-        wins = [t for t in self.trades if t["is_win"]]
-        losses = [t for t in self.trades if not t["is_win"]]
-        
-        total_pnl_pct = sum(t["pnl_pct"] for t in self.trades)
-        total_pnl_usd = sum(t["pnl_usd"] for t in self.trades)
+        # Running aggregates kept by record_trade/load - no pass over the history
+        total = len(self.trades)
+        wins = self._wins
+        losses = total - wins
         
-        avg_win = sum(t["pnl_pct"] for t in wins) / len(wins) if wins else 0
-        avg_loss = sum(t["pnl_pct"] for t in losses) / len(losses) if losses else 0
+        avg_win = self._sum_win_pct / wins if wins else 0
+        avg_loss = self._sum_loss_pct / losses if losses else 0
         
-        best = max(self.trades, key=lambda t: t["pnl_pct"])
-        worst = min(self.trades, key=lambda t: t["pnl_pct"])
+        best = self._best
+        worst = self._worst
         
         return {
-            "total_trades": len(self.trades),
-            "wins": len(wins),
-            "losses": len(losses),
-            "win_rate": round((len(wins) / len(self.trades)) * 100, 2),
-            "total_pnl_pct": round(total_pnl_pct, 2),
-            "total_pnl_usd": round(total_pnl_usd, 4),
+            "total_trades": total,
+            "wins": wins,
+            "losses": losses,
+            "win_rate": round((wins / total) * 100, 2),
+            "total_pnl_pct": round(self._sum_pnl_pct, 2),
+            "total_pnl_usd": round(self._sum_pnl_usd, 4),
             "avg_win_pct": round(avg_win, 2),
             "avg_loss_pct": round(avg_loss, 2),
             "best_trade": {
@@ -181,7 +364,7 @@ class TradeTracker:
     
     def get_recent_trades(self, n: int = 10) -> List[Dict]:
         """Get N most recent trades."""
-        return self.trades[-n:][::-1]  # Newest first
+        return list(islice(reversed(self.trades), n))  # Newest first, no intermediate slices
     
     def print_summary(self):
         """Print a formatted summary of trading performance."""
@@ -251,6 +434,8 @@ if __name__ == "__main__":
     for trade in tracker.get_recent_trades(5):
         print(f"   {trade['symbol']} {trade['side']}: {trade['pnl_pct']:+.2f}%")
     
-    # Cleanup test file
-    import os
-    os.remove("test_trades.json")
+    # Cleanup test files
+    tracker.close()
+    for path in (tracker.filepath, tracker.snapshot_path, tracker.journal_path, tracker.orders_path):
+        if path.exists():
+            path.unlink()